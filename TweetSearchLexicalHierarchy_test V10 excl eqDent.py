@@ -1,9 +1,12 @@
 # Extracts tweets using single-page Strategy C with correct lexical hierarchy
-import tweepy
 import sqlite3
-import time
-import re
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
+from tweets_schema import migrate, require_users_split, CREATE_TWEETS_SQL, CREATE_USERS_SQL
+from tweet_ingest import apply_ingest_profile, tweet_rows, user_rows, IngestMeter
+from term_matcher import TermMatcher
+from collection_state import ensure_state_table, plan_request, record_page, mark_complete
+from search_scheduler import TokenBucket, build_work_list, run_schedule, make_header_tracking_client
+from search_scheduler import build_query as search_query
 
 # ===============================
 # USER CONFIGURATION
@@ -16,7 +19,13 @@ DAYS_BACK = [7]                 # list of days back to sample (0=today, 1=yester
 SLICE_HOUR_UTC = 0             # hour of day (UTC) to sample
 SLICE_DURATION_MINUTES = 1438     # duration of each slice in minutes
 
+MAX_IN_FLIGHT = 4               # concurrent search requests
+REQUESTS_PER_WINDOW = 450       # search_recent_tweets limit per 15-minute window for this token
+PAGINATE = False                # False = single page per slice (Strategy C)
+MAX_TWEETS_PER_TERM = 300       # with PAGINATE, stop paging a term after this many saved tweets
+
 EXCLUDE_TERMS = ["bot", "spam", "giveaway", "crypto", "airdrop", "NFT", "retweet", "follow"]
+EXCLUDE_ACCOUNTS = ["equine__dentist"]
 
 SEMANTIC_SETS = {
     "political": [
@@ -64,191 +73,88 @@ SEMANTIC_SETS = {
 # ===============================
 # Twitter API setup
 # ===============================
-client = tweepy.Client(
+# rate limits are handled by the scheduler's token bucket, not by blocking inside tweepy
+client = make_header_tracking_client(
     bearer_token=BEARER_TOKEN,
-    wait_on_rate_limit=True
+    wait_on_rate_limit=False
 )
 
 # ===============================
 # Database setup
 # ===============================
 conn = sqlite3.connect(DB_PATH)
+apply_ingest_profile(conn)
 c = conn.cursor()
 
-# NOTE: This CREATE TABLE is here only in case the DB is new.
-# If your DB already exists, it won't overwrite anything.
-c.execute("""
-CREATE TABLE IF NOT EXISTS tweets (
-    tweet_id TEXT PRIMARY KEY,
-    semantic_set TEXT,
-    lexical_hierarchy INTEGER,
-    search_term TEXT,
-    text TEXT,
-    usnmtext TEXT,
-    term_present BOOLEAN,
-    corr_def REAL,
-    created_at TEXT,
-    like_count INTEGER,
-    retweet_count INTEGER,
-    reply_count INTEGER,
-    sentiment_score REAL,
-    user_id TEXT,
-    username TEXT,
-    name TEXT,
-    followers_count INTEGER,
-    following_count INTEGER,
-    tweet_count INTEGER,
-    account_created_at TEXT
-)
-""")
+# NOTE: These CREATE TABLEs are here only in case the DB is new.
+# If your DB already exists, it won't overwrite anything (cli.py migrate upgrades it).
+c.execute(CREATE_TWEETS_SQL)
+c.execute(CREATE_USERS_SQL)
 conn.commit()
+migrate(conn)
+require_users_split(conn)
+ensure_state_table(conn)
 
 # ===============================
 # Helper functions
 # ===============================
 def build_query(search_term):
-    query = f'"{search_term}" -is:retweet -has:links -is:quote'
-    for term in EXCLUDE_TERMS:
-        query += f' -"{term}"'
-
     # EXCLUDE ONLY: tweets from or mentioning @equine__dentist
-    query += " -from:equine__dentist -@equine__dentist"
-
-    return query
-
-def strip_leading_handles(text):
-    """
-    Removes leading tokens that start with '@' (only at the beginning).
-    Does NOT remove @mentions later in the text.
-    """
-    if not text:
-        return text
-    tokens = text.split()
-    i = 0
-    while i < len(tokens) and tokens[i].startswith("@"):
-        i += 1
-    return " ".join(tokens[i:])
-
-def whole_word_present(text, term):
-    """
-    Case-insensitive whole-word / whole-phrase match.
-    - tax should NOT match taxation
-    - multi-word phrase should match as a phrase
-    """
-    if not text or not term:
-        return False
-    pattern = r"\b" + re.escape(term) + r"\b"
-    return re.search(pattern, text, flags=re.IGNORECASE) is not None
-
-def insert_tweet(tweet, user, semantic_set, hierarchy_idx, search_term):
-    usnmtext_value = strip_leading_handles(tweet.text)
-    term_present_value = 1 if whole_word_present(usnmtext_value, search_term) else 0
-    corr_def_value = None  # placeholder
-
-    c.execute("""
-    INSERT OR IGNORE INTO tweets (
-        tweet_id, semantic_set, lexical_hierarchy, search_term,
-        text, usnmtext, term_present, corr_def,
-        created_at, like_count, retweet_count, reply_count, sentiment_score,
-        user_id, username, name, followers_count, following_count, tweet_count, account_created_at
-    ) VALUES (
-        ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
-    )
-    """, (
-        tweet.id,
-        semantic_set,
-        hierarchy_idx,      # lexical hierarchy position
-        search_term,
-        tweet.text,
-        usnmtext_value,
-        term_present_value,
-        corr_def_value,
-        tweet.created_at.isoformat(),
-        tweet.public_metrics.get("like_count", 0),
-        tweet.public_metrics.get("retweet_count", 0),
-        tweet.public_metrics.get("reply_count", 0),
-        None,               # sentiment score placeholder
-        user.id,
-        user.username,
-        user.name,
-        user.public_metrics.get("followers_count", 0),
-        user.public_metrics.get("following_count", 0),
-        user.public_metrics.get("tweet_count", 0),
-        user.created_at.isoformat()
-    ))
-    conn.commit()
+    return search_query(search_term, EXCLUDE_TERMS, EXCLUDE_ACCOUNTS)
 
 # ===============================
 # Strategy C execution
 # ===============================
 script_start = datetime.now(timezone.utc)
 print("Script start:", script_start.isoformat())
+meter = IngestMeter()
+matcher = TermMatcher.from_semantic_sets(SEMANTIC_SETS)
+
+jobs = build_work_list(SEMANTIC_SETS, DAYS_BACK, build_query, script_start, SLICE_HOUR_UTC, SLICE_DURATION_MINUTES)
+
+# checkpoints: complete slices cost nothing, unfinished ones resume where they stopped
+plans = {job: plan_request(conn, job) for job in jobs}
+skipped = sum(1 for extra in plans.values() if extra is None)
+jobs = [job for job in jobs if plans[job] is not None]
+print(f"Scheduled {len(jobs)} (term, slice) requests, {MAX_IN_FLIGHT} in flight ({skipped} slices already complete)")
+
+tweets_saved = {}
+
+def save_page(job, response, extra):
+    # the page's checkpoint and its tweets are committed in one transaction
+    record_page(conn, job, response, extra)
+    if not response.data:
+        conn.commit()
+        print(f"  [{job.term}] Day {job.day_back}: 0 tweets returned")
+        return 0
+
+    users = {u.id: u for u in response.includes["users"]} if response.includes and "users" in response.includes else {}
+
+    # derive the whole response, then write it in one transaction
+    rows = tweet_rows(response.data, users, job.semantic_set, job.term_idx, job.term, matcher)
+    meter.write(conn, rows, user_rows(users.values()))
+    conn.commit()
+    tweets_saved[job.term] = tweets_saved.get(job.term, 0) + len(rows)
+
+    print(f"  [{job.term}] Day {job.day_back}: returned={len(response.data)}, saved={len(rows)}")
+    return len(rows)
+
+stats = run_schedule(
+    client,
+    jobs,
+    save_page,
+    max_results=MAX_TWEETS_PER_SLICE,
+    max_in_flight=MAX_IN_FLIGHT,
+    bucket=TokenBucket(REQUESTS_PER_WINDOW),
+    paginate=PAGINATE,
+    max_tweets_per_term=MAX_TWEETS_PER_TERM if PAGINATE else None,
+    request_kwargs=plans.get,
+    on_done=lambda job: mark_complete(conn, job)
+)
 
-for semantic_set, hierarchies in SEMANTIC_SETS.items():
-    for hierarchy_idx, hierarchy in enumerate(hierarchies):
-        for term_idx, term in enumerate(hierarchy):
-            # Skip empty placeholders
-            if not term or not term.strip():
-                continue
-
-            query = build_query(term)
-            print(f"\nSampling term: {term}, semantic set '{semantic_set}', hierarchy index {term_idx}")
-
-            tweets_saved = 0
-
-            for day_back in DAYS_BACK:
-                # Calculate slice start and end based on user-defined time
-                slice_start = datetime(
-                    year=script_start.year,
-                    month=script_start.month,
-                    day=(script_start - timedelta(days=day_back)).day,
-                    hour=SLICE_HOUR_UTC,
-                    minute=0,
-                    second=0,
-                    tzinfo=timezone.utc
-                )
-                slice_end = slice_start + timedelta(minutes=SLICE_DURATION_MINUTES)
-
-                # Ensure slice is at least 10 seconds before now (Twitter API requirement)
-                if slice_end >= script_start - timedelta(seconds=10):
-                    slice_end = script_start - timedelta(seconds=10)
-                if slice_start >= slice_end:
-                    print(f"  Skipping day {day_back}: slice start >= slice end")
-                    continue
-
-                try:
-                    response = client.search_recent_tweets(
-                        query=query,
-                        tweet_fields=["author_id", "created_at", "public_metrics", "lang"],
-                        expansions=["author_id"],
-                        user_fields=["username", "name", "public_metrics", "created_at"],
-                        start_time=slice_start,
-                        end_time=slice_end,
-                        max_results=MAX_TWEETS_PER_SLICE
-                        # single page only, no paginator
-                    )
-
-                    if not response.data:
-                        print(f"  Day {day_back}: 0 tweets returned")
-                        continue
-
-                    users = {u.id: u for u in response.includes["users"]} if response.includes and "users" in response.includes else {}
-
-                    slice_saved = 0
-                    for tweet in response.data:
-                        user = users.get(tweet.author_id)
-                        if user:
-                            insert_tweet(tweet, user, semantic_set, term_idx, term)
-                            tweets_saved += 1
-                            slice_saved += 1
-
-                    print(f"  Day {day_back}: returned={len(response.data)}, saved={slice_saved}")
-
-                except Exception as e:
-                    print(f"  Error on day {day_back}: {e}")
-                    time.sleep(5)
-
-            print(f"Finished term '{term}': saved {tweets_saved} tweets total")
+for term, saved in tweets_saved.items():
+    print(f"Finished term '{term}': saved {saved} tweets total")
+print(f"Requests: {stats['requests']}, rate limited: {stats['rate_limited']}, errors: {stats['errors']}")
 
 conn.close()
-print("Done collecting tweets.")
+print(f"Done collecting tweets. Wrote {meter.rows} new rows at {meter.rate():.0f} rows/s.")
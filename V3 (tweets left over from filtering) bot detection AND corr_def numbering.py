@@ -2,13 +2,13 @@ import os
 import sys
 import time
 import sqlite3
-import pandas as pd
-from tkinter import Tk, filedialog
+from tweets_schema import migrate, ACCEPTED_COUNT_SQL, has_accepted_summary, summary_table
 
 # ============================================================
 # File picker
 # ============================================================
 def pick_file(title, filetypes):
+    from tkinter import Tk, filedialog
     root = Tk()
     root.withdraw()
     root.attributes("-topmost", True)
@@ -20,8 +20,9 @@ def pick_file(title, filetypes):
 # SQLite helpers
 # ============================================================
 def get_table_with_column(conn, col_name):
+    # tweets first: collection_state and other bookkeeping tables also have search_term
     cur = conn.cursor()
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;")
+    cur.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name != 'tweets', name;")
     for (table,) in cur.fetchall():
         cur.execute(f"PRAGMA table_info({table})")
         cols = [row[1] for row in cur.fetchall()]
@@ -40,36 +41,82 @@ def count_accepted(conn, table, phrase):
       - search_term matches phrase (case-insensitive, trimmed)
       - corr_def is exactly 1.0 (numeric)
       - not_bot is 1
+    migrate() stores corr_def/not_bot as numbers, so this can use idx_<table>_accepted.
     """
     cur = conn.cursor()
-    cur.execute(
-        f"""
-        SELECT COUNT(*)
-        FROM {table}
-        WHERE LOWER(TRIM(search_term)) = LOWER(TRIM(?))
-          AND CAST(corr_def AS REAL) = 1.0
-          AND CAST(not_bot AS INTEGER) = 1
-        """,
-        (phrase,),
-    )
+    cur.execute(ACCEPTED_COUNT_SQL.format(table=table), (phrase,))
     return int(cur.fetchone()[0])
 
+def count_accepted_all(conn, table, phrases):
+    """
+    Same counts as count_accepted, for every phrase in one query.
+    phrases is a list of (row_index, phrase); returns {row_index: count}.
+    The phrases go into a temp table that is joined against the accepted rows
+    (or against <table>_accepted_counts when that summary table exists).
+    """
+    cur = conn.cursor()
+    cur.execute("DROP TABLE IF EXISTS temp.v3_phrases")
+    cur.execute("CREATE TEMP TABLE v3_phrases (row_idx INTEGER PRIMARY KEY, phrase_key TEXT)")
+    cur.executemany(
+        "INSERT INTO temp.v3_phrases (row_idx, phrase_key) VALUES (?, LOWER(TRIM(?)))",
+        phrases,
+    )
+
+    if has_accepted_summary(conn, table):
+        print(f"Using summary table: {summary_table(table)}")
+        cur.execute(
+            f"""
+            SELECT p.row_idx, COALESCE(SUM(s.n), 0)
+            FROM temp.v3_phrases p
+            LEFT JOIN {summary_table(table)} s ON s.search_key = p.phrase_key
+            GROUP BY p.row_idx
+            """
+        )
+    else:
+        cur.execute(
+            f"""
+            WITH accepted AS (
+                SELECT LOWER(TRIM(search_term)) AS phrase_key, COUNT(*) AS n
+                FROM {table}
+                WHERE corr_def = 1.0
+                  AND not_bot = 1
+                GROUP BY 1
+            )
+            SELECT p.row_idx, COALESCE(a.n, 0)
+            FROM temp.v3_phrases p
+            LEFT JOIN accepted a ON a.phrase_key = p.phrase_key
+            """
+        )
+    counts = {row_idx: int(n) for row_idx, n in cur.fetchall()}
+    cur.execute("DROP TABLE temp.v3_phrases")
+    return counts
+
 # ============================================================
 # Main
 # ============================================================
-def main():
-    db_path = pick_file(
-        "Select SQLite Database (.db)",
-        [("SQLite Database", "*.db"), ("All files", "*.*")]
-    )
+def main(db_path=None, csv_path=None, excel=True):
+    """
+    db_path/csv_path default to the file pickers; pass both to run headless.
+    excel=False writes the filled CSV rows as Parquet instead of Excel
+    (tweet_export.py exports the whole DB).
+    """
+    # pandas is only needed here, so importing this module for its helpers stays cheap
+    import pandas as pd
+
+    if db_path is None:
+        db_path = pick_file(
+            "Select SQLite Database (.db)",
+            [("SQLite Database", "*.db"), ("All files", "*.*")]
+        )
     if not db_path:
         print("No database selected. Exiting.")
         return
 
-    csv_path = pick_file(
-        "Select CSV File (.csv)",
-        [("CSV files", "*.csv"), ("All files", "*.*")]
-    )
+    if csv_path is None:
+        csv_path = pick_file(
+            "Select CSV File (.csv)",
+            [("CSV files", "*.csv"), ("All files", "*.*")]
+        )
     if not csv_path:
         print("No CSV selected. Exiting.")
         return
@@ -101,22 +148,32 @@ def main():
         if not table_has_column(conn, table, "not_bot"):
             raise RuntimeError(f"Database table '{table}' is missing column 'not_bot'.")
 
-        # Fill final_ammount for each phrase
-        filled = 0
+        migrate(conn, table)
+
+        # Fill final_ammount for every phrase with one aggregated query
+        phrases = []
         for i, raw_phrase in enumerate(df["phrase"]):
             if pd.isna(raw_phrase):
                 continue
             phrase = str(raw_phrase).strip()
             if not phrase:
                 continue
+            phrases.append((i, phrase))
 
-            df.at[i, "final_ammount"] = count_accepted(conn, table, phrase)
-            filled += 1
+        for i, count in count_accepted_all(conn, table, phrases).items():
+            df.at[i, "final_ammount"] = count
+        filled = len(phrases)
 
         print(f"Filled final_ammount for {filled} phrase rows.")
 
-        # Save NEW Excel file in same folder as selected CSV
         output_dir = os.path.dirname(csv_path)
+        if not excel:
+            parquet_output = os.path.join(output_dir, "not_bugged final tweet ammount.parquet")
+            df.to_parquet(parquet_output, index=False)
+            print(f"\nSaved Parquet to:\n{parquet_output}")
+            return
+
+        # Save NEW Excel file in same folder as selected CSV
         base_output = os.path.join(output_dir, "not_bugged final tweet ammount.xlsx")
 
         try:
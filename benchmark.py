@@ -0,0 +1,551 @@
+"""
+Offline benchmarks for the collection and scoring stages.
+
+    python benchmark.py ingest [n_rows]
+    python benchmark.py bots [n_rows]
+    python benchmark.py pipeline [n_terms]
+    python benchmark.py replies [n_tweets]
+    python benchmark.py prompts [n_tweets]
+    python benchmark.py generate path/to/synthetic.db n_tweets
+    python benchmark.py suite [n_tweets] [stage ...]
+
+The suite builds (once) a synthetic DB of n_tweets tweets plus replies, runs each
+stage on a fresh copy in its own process against the offline fakes, and appends
+rows/s, peak RSS and p50/p99 latency per stage to BENCH_RESULTS_PATH, flagging
+stages that got slower than the previous recorded run at the same scale.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import platform
+import tempfile
+import subprocess
+
+from fakes import synthetic_response, build_synthetic_db, build_tiny_sentiment_model, FakeGeminiModel
+from pipeline_metrics import percentile
+from tweets_schema import CREATE_TWEETS_SQL, CREATE_USERS_SQL, migrate
+from bot_scoring import score_bots
+from tweet_ingest import INSERT_TWEET_SQL, UPSERT_USER_SQL, apply_ingest_profile, tweet_rows, user_rows, IngestMeter
+
+
+# ============================================================
+# Helpers
+# ============================================================
+def fresh_db(directory, name):
+    path = os.path.join(directory, name)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    conn = sqlite3.connect(path)
+    conn.execute(CREATE_TWEETS_SQL)
+    conn.execute(CREATE_USERS_SQL)
+    conn.commit()
+    migrate(conn)
+    return conn
+
+
+def response_stream(n_rows, per_response=100, seed=0):
+    """Yields (term, response) pairs totalling n_rows tweets, like one collector run."""
+    rng = random.Random(seed)
+    terms = ["tax", "horse", "canyon", "geological formation", "cephalopod"]
+    start_id = 10**17
+    while n_rows > 0:
+        n = min(per_response, n_rows)
+        term = rng.choice(terms)
+        yield term, synthetic_response(term, n, rng, start_id=start_id)
+        start_id += n
+        n_rows -= n
+
+
+def users_by_id(response):
+    return {u.id: u for u in response.includes["users"]}
+
+
+# ============================================================
+# Ingest
+# ============================================================
+def bench_ingest(n_rows=20000, per_response=100, directory=None):
+    """
+    Replays a synthetic response stream into fresh DBs, once with the old
+    insert-and-commit-per-row path and once with the bulk path. Returns rows/s for each.
+    """
+    directory = directory or tempfile.mkdtemp(prefix="tweets_bench_")
+    stream = list(response_stream(n_rows, per_response))
+    results = {}
+
+    conn = fresh_db(directory, "per_row.db")
+    start = time.perf_counter()
+    for term, response in stream:
+        users = users_by_id(response)
+        for row in tweet_rows(response.data, users, "bench", 0, term):
+            conn.execute(UPSERT_USER_SQL, user_rows([users[row[-1]]])[0])
+            conn.execute(INSERT_TWEET_SQL, row)
+            conn.commit()
+    results["per_row_commit"] = n_rows / (time.perf_counter() - start)
+    conn.close()
+
+    conn = fresh_db(directory, "bulk.db")
+    apply_ingest_profile(conn)
+    meter = IngestMeter()
+    start = time.perf_counter()
+    for term, response in stream:
+        users = users_by_id(response)
+        meter.write(conn, tweet_rows(response.data, users, "bench", 0, term), user_rows(users.values()))
+    results["bulk_per_response"] = n_rows / (time.perf_counter() - start)
+    conn.close()
+
+    for name, rate in results.items():
+        print(f"ingest {name}: {rate:,.0f} rows/s ({n_rows} rows, {per_response} per response)")
+    return results
+
+
+# ============================================================
+# Bot scoring
+# ============================================================
+def fill_bot_db(conn, n_rows, tweets_per_user=10, bot_share=0.05, seed=0):
+    """Writes n_rows tweets by n_rows / tweets_per_user users; bot_share of them post in bursts."""
+    rng = random.Random(seed)
+    base = 1_700_000_000
+    n_users = max(1, n_rows // tweets_per_user)
+    users = []
+    tweets = []
+    for u in range(n_users):
+        bot = rng.random() < bot_share
+        user_id = f"{u:012d}"
+        users.append((
+            user_id, f"user{u}", f"User {u}",
+            rng.randint(0, 50) if bot else rng.randint(10, 5000),
+            rng.randint(1000, 5000) if bot else rng.randint(10, 2000),
+            rng.randint(1000, 100000),
+            time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(base - rng.randint(30, 3000) * 86400)),
+            time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(base)),
+        ))
+        t = base - rng.randint(0, 7 * 86400)
+        for i in range(tweets_per_user):
+            t += rng.randint(1, 5) if bot else rng.randint(600, 86400)
+            tweet_id = str(u * tweets_per_user + i)
+            created = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(t))
+            tweets.append((tweet_id, "bench", 0, "tax", "text", "text", 1, None, created, 0, 0, 0, None, user_id))
+    with conn:
+        conn.executemany("INSERT INTO users VALUES (?, ?, ?, ?, ?, ?, ?, ?)", users)
+        conn.executemany(INSERT_TWEET_SQL, tweets)
+
+
+def bench_bots(n_rows=100000, directory=None, scales=(1, 2, 4)):
+    """
+    Scores synthetic DBs of n_rows * scale tweets. Scaling is linear when
+    rows/s stays flat across scales. Returns {rows: rows/s}.
+    """
+    directory = directory or tempfile.mkdtemp(prefix="tweets_bench_")
+    results = {}
+    for scale in scales:
+        rows = n_rows * scale
+        conn = fresh_db(directory, f"bots_{rows}.db")
+        apply_ingest_profile(conn)
+        fill_bot_db(conn, rows)
+        start = time.perf_counter()
+        n_users, n_bots = score_bots(conn)
+        elapsed = time.perf_counter() - start
+        conn.close()
+        results[rows] = rows / elapsed
+        print(f"bots {rows} rows: {elapsed:.2f}s, {rows / elapsed:,.0f} rows/s ({n_users} users, {n_bots} bots)")
+    return results
+
+
+# ============================================================
+# Pipeline
+# ============================================================
+def bench_pipeline(n_terms=8, days_back=(1, 2, 3), twitter_latency=0.2, gemini_latency=0.3, directory=None):
+    """
+    Runs the same collect -> define -> sentiment -> count job twice against the
+    fakes, with the stages overlapped and one after another. Returns {mode: seconds}.
+    """
+    import pipeline
+    from fakes import FakeTwitterClient, SYNTHETIC_TERMS
+    from search_scheduler import build_query
+
+    directory = directory or tempfile.mkdtemp(prefix="tweets_bench_")
+    terms = SYNTHETIC_TERMS[:n_terms]
+    word_map = {term: f"the ordinary dictionary sense of '{term}'" for term in terms}
+    semantic_sets = {"bench": [[term] for term in terms]}
+    results = {}
+    for overlap in (False, True):
+        mode = "overlapped" if overlap else "sequential"
+        db_path = os.path.join(directory, f"pipeline_{mode}.db")
+        start = time.perf_counter()
+        pipeline.run_pipeline(
+            db_path, FakeTwitterClient(latency=twitter_latency, tweets_per_query=300), semantic_sets, word_map,
+            FakeGeminiModel(latency=gemini_latency), build_query, days_back=days_back,
+            schedule_kwargs={"max_results": 100, "paginate": True}, overlap=overlap
+        )
+        results[mode] = time.perf_counter() - start
+    print(f"pipeline: sequential {results['sequential']:.1f}s, overlapped {results['overlapped']:.1f}s")
+    return results
+
+
+# ============================================================
+# Replies
+# ============================================================
+def bench_replies(n_tweets=5000, twitter_latency=0.1, in_flight=(1, 4, 8), directory=None):
+    """
+    Harvests the replies of a synthetic DB's tweets against the rate-limited fake
+    client at each concurrency, then reruns once to check the checkpoints
+    (zero requests). Returns {max_in_flight: replies/s}.
+    """
+    from fakes import FakeTwitterClient
+    from reply_harvester import harvest_replies
+
+    directory = directory or tempfile.mkdtemp(prefix="tweets_bench_")
+    results = {}
+    for max_in_flight in in_flight:
+        db_path = os.path.join(directory, f"replies_{max_in_flight}.db")
+        build_synthetic_db(db_path, n_tweets, replies_per_tweet=0)
+        conn = sqlite3.connect(db_path)
+        apply_ingest_profile(conn)
+        client = FakeTwitterClient(latency=twitter_latency)
+        result = harvest_replies(conn, client, max_in_flight=max_in_flight)
+        rerun = FakeTwitterClient()
+        harvest_replies(conn, rerun, max_in_flight=max_in_flight)
+        conn.close()
+        results[max_in_flight] = result["replies"] / result["seconds"]
+        print(f"replies, {max_in_flight} in flight: {result['replies']} replies of {result['conversations']} "
+              f"conversations in {result['seconds']:.2f}s = {results[max_in_flight]:,.0f} replies/s, "
+              f"{result['requests']} requests ({result['rate_limited']} rate limited), rerun {rerun.calls} requests")
+    return results
+
+
+# ============================================================
+# Prompts
+# ============================================================
+def bench_prompts(n_tweets=6000, directory=None):
+    """
+    Scores the same pending tweets with the verbose and the compact prompt
+    against the fake model and compares the reported tokens per tweet sent.
+    Returns {mode: summary["tokens"]}.
+    """
+    import GeminiTweetDefinitionQueryV2 as gemini
+    from fakes import SYNTHETIC_TERMS
+
+    directory = directory or tempfile.mkdtemp(prefix="tweets_bench_")
+    base = os.path.join(directory, f"prompts_{n_tweets}.db")
+    build_synthetic_db(base, n_tweets, replies_per_tweet=0, pending_share=1.0, duplicate_share=0.0)
+    word_map = {term: f"the ordinary dictionary sense of '{term}'" for term in SYNTHETIC_TERMS}
+    results = {}
+    for mode in ("verbose", "compact"):
+        db_path = os.path.join(directory, f"prompts_{mode}.db")
+        shutil.copy(base, db_path)
+        gemini.run_analysis(db_path, word_map, FakeGeminiModel(latency=FAKE_GEMINI_LATENCY), prompt_mode=mode)
+        results[mode] = gemini.throughput_summary({}, 1.0)["tokens"]
+        results[mode]["tweets_sent"] = gemini.metrics.counter_total("tweets_sent_total")
+    for mode, tokens in results.items():
+        uncached = (tokens["prompt"] - tokens["cached"]) / tokens["tweets_sent"]
+        print(f"prompts {mode:>8}: {tokens['prompt_per_tweet']:.1f} in ({uncached:.1f} uncached) / "
+              f"{tokens['response_per_tweet']:.1f} out tokens per tweet over {tokens['tweets_sent']} tweets")
+    return results
+
+
+# ============================================================
+# Suite
+# ============================================================
+BENCH_DIR = "bench_data"                        # synthetic DBs, work copies and the tiny model
+BENCH_RESULTS_PATH = os.path.join(BENCH_DIR, "benchmark_results.jsonl")  # one JSON line per stage per suite run
+SUITE_STAGES = ("ingest", "term_match", "definition", "bots", "sentiment", "counting", "analytics", "export")
+REGRESSION_THRESHOLD = 0.20     # flag a stage whose rows/s dropped by more than this
+INGEST_MAX_ROWS = 200000        # the ingest stage replays at most this many tweets
+FAKE_GEMINI_LATENCY = 0.01      # seconds per fake Gemini call
+MATCH_SAMPLE = 10000            # texts timed one by one for the term matching latency
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where the resource module is missing)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def git_revision():
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=here, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=here, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return "unknown"
+    return (rev or "unknown") + ("+dirty" if dirty else "")
+
+
+def stage_ingest(db_path, n_rows):
+    """
+    Bulk ingest of synthetic search responses into a fresh DB; latency per response write.
+    Like every stage it returns (rows, seconds spent on the measured work, latencies).
+    """
+    directory = tempfile.mkdtemp(prefix="tweets_bench_")
+    conn = fresh_db(directory, "ingest.db")
+    apply_ingest_profile(conn)
+    meter = IngestMeter()
+    latencies = []
+    n = min(n_rows, INGEST_MAX_ROWS)
+    for term, response in list(response_stream(n)):
+        users = users_by_id(response)
+        start = time.perf_counter()
+        meter.write(conn, tweet_rows(response.data, users, "bench", 0, term), user_rows(users.values()))
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    shutil.rmtree(directory, ignore_errors=True)
+    return n, sum(latencies), latencies
+
+
+def stage_term_match(db_path, n_rows):
+    """term_present backfill over the whole DB; latency per text matched."""
+    from term_matcher import TermMatcher, backfill_term_present
+    conn = sqlite3.connect(db_path)
+    apply_ingest_profile(conn)
+    matcher = TermMatcher(t for (t,) in conn.execute("SELECT DISTINCT search_term FROM tweets"))
+    latencies = []
+    for term, text in conn.execute("SELECT search_term, usnmtext FROM tweets LIMIT ?", (MATCH_SAMPLE,)):
+        start = time.perf_counter()
+        matcher.contains(text, term)
+        latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    scanned, _ = backfill_term_present(conn, matcher=matcher)
+    seconds = time.perf_counter() - start
+    conn.close()
+    return scanned, seconds, latencies
+
+
+def stage_definition(db_path, n_rows):
+    """corr_def scoring of every pending tweet with the fake Gemini model; latency per call."""
+    import GeminiTweetDefinitionQueryV2 as gemini
+    conn = sqlite3.connect(db_path)
+    terms = [t for (t,) in conn.execute("SELECT DISTINCT search_term FROM tweets")]
+    conn.close()
+    word_map = {term: f"the ordinary dictionary sense of '{term}'" for term in terms}
+    start = time.perf_counter()
+    gemini.run_analysis(db_path, word_map, FakeGeminiModel(latency=FAKE_GEMINI_LATENCY))
+    seconds = time.perf_counter() - start
+    return gemini.metrics.counter_total("tweets_scored_total"), seconds, gemini.metrics.histogram_samples("call_seconds")
+
+
+def stage_bots(db_path, n_rows):
+    """Bot scoring over every user; latency per user chunk."""
+    conn = sqlite3.connect(db_path)
+    apply_ingest_profile(conn)
+    latencies = []
+    start = time.perf_counter()
+    score_bots(conn, on_chunk=lambda n, seconds: latencies.append(seconds))
+    seconds = time.perf_counter() - start
+    rows = conn.execute("SELECT COUNT(*) FROM tweets").fetchone()[0]
+    conn.close()
+    return rows, seconds, latencies
+
+
+def stage_sentiment(db_path, n_rows):
+    """Reply sentiment with the tiny local model; latency per reply chunk."""
+    os.environ["SENTIMENT_MODEL"] = build_tiny_sentiment_model(os.path.join(BENCH_DIR, "tiny_sentiment_model"))
+    import sentiment_analysis
+    conn = sqlite3.connect(db_path)
+    sentiment_analysis.ensure_cache_table(conn)
+    latencies = []
+    rows = []
+    start = time.perf_counter()
+    sums, counts = sentiment_analysis.score_replies(
+        conn, on_chunk=lambda n, seconds: (latencies.append(seconds), rows.append(n))
+    )
+    sentiment_analysis.write_mean_sentiment(conn, sums, counts)
+    seconds = time.perf_counter() - start
+    conn.close()
+    return sum(rows), seconds, latencies
+
+
+def stage_counting(db_path, n_rows):
+    """V3 accepted counts for every search term in one query; latency per single-phrase count."""
+    from scripts import load_script, V3_SCRIPT
+    v3 = load_script(V3_SCRIPT)
+
+    conn = sqlite3.connect(db_path)
+    from bot_scoring import ensure_not_bot_column
+    ensure_not_bot_column(conn)
+    phrases = list(enumerate(t for (t,) in conn.execute("SELECT DISTINCT search_term FROM tweets")))
+    latencies = []
+    for _, phrase in phrases:
+        start = time.perf_counter()
+        v3.count_accepted(conn, "tweets", phrase)
+        latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    v3.count_accepted_all(conn, "tweets", phrases)
+    seconds = time.perf_counter() - start
+    rows = conn.execute("SELECT COUNT(*) FROM tweets").fetchone()[0]
+    conn.close()
+    return rows, seconds, latencies
+
+
+def stage_analytics(db_path, n_rows):
+    """Cold hierarchy analytics over the accepted rows; latencies are the cold and the cached run."""
+    from hierarchy_analytics import analyze
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE IF EXISTS analytics_cache")
+    latencies = []
+    for _ in range(2):
+        start = time.perf_counter()
+        analyze(conn)
+        latencies.append(time.perf_counter() - start)
+    rows = conn.execute("SELECT COUNT(*) FROM tweets WHERE corr_def = 1.0 AND not_bot = 1").fetchone()[0]
+    conn.close()
+    return rows, latencies[0], latencies
+
+
+def stage_export(db_path, n_rows):
+    """Partitioned Parquet export of the whole tweets table; latency per fetched chunk."""
+    from tweet_export import export_db
+    latencies = []
+    out_dir = tempfile.mkdtemp(prefix="tweets_export_")
+    try:
+        manifest = export_db(db_path, out_dir, on_chunk=lambda n, seconds: latencies.append(seconds))
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return manifest["rows"], manifest["seconds"], latencies
+
+
+STAGES = {
+    "ingest": stage_ingest,
+    "term_match": stage_term_match,
+    "definition": stage_definition,
+    "bots": stage_bots,
+    "sentiment": stage_sentiment,
+    "counting": stage_counting,
+    "analytics": stage_analytics,
+    "export": stage_export,
+}
+
+
+def run_stage(name, db_path, n_rows):
+    """Runs one stage in this process and returns its result record."""
+    rows, elapsed, latencies = STAGES[name](db_path, n_rows)
+    latencies = sorted(latencies)
+    p50 = percentile(latencies, 50)
+    p99 = percentile(latencies, 99)
+    return {
+        "stage": name,
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_s": rows / elapsed if elapsed > 0 else None,
+        "p50_ms": p50 * 1000 if p50 is not None else None,
+        "p99_ms": p99 * 1000 if p99 is not None else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def synthetic_db(n_tweets, directory=BENCH_DIR):
+    """Path of the synthetic DB for n_tweets, building it on first use."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"synthetic_{n_tweets}.db")
+    if not os.path.exists(path):
+        tmp = path + ".partial"
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(tmp + suffix):
+                os.remove(tmp + suffix)
+        start = time.perf_counter()
+        n, n_replies = build_synthetic_db(tmp, n_tweets)
+        os.replace(tmp, path)
+        print(f"Built {path}: {n} tweets, {n_replies} replies in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+def previous_results(results_path, n_rows):
+    """{stage: last recorded result} at this scale."""
+    last = {}
+    if os.path.exists(results_path):
+        with open(results_path, encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get("n_rows") == n_rows and record.get("rows_per_s"):
+                    last[record["stage"]] = record
+    return last
+
+
+def bench_suite(n_rows=10000, stages=SUITE_STAGES, directory=BENCH_DIR, results_path=BENCH_RESULTS_PATH):
+    """
+    Runs every stage on a fresh copy of the synthetic DB, each in a child process
+    so peak RSS is per stage. Stages run in order on the same copy (term_match
+    before definition, bots before counting). Appends the results to results_path.
+    """
+    base = synthetic_db(n_rows, directory)
+    work = os.path.join(directory, f"work_{n_rows}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(work + suffix):
+            os.remove(work + suffix)
+    shutil.copyfile(base, work)
+
+    previous = previous_results(results_path, n_rows)
+    context = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "n_rows": n_rows,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+    results = []
+    for name in stages:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "stage", name, work, str(n_rows)],
+            capture_output=True, text=True
+        )
+        lines = [l for l in proc.stdout.splitlines() if l.startswith("BENCH_RESULT ")]
+        if proc.returncode != 0 or not lines:
+            print(f"{name}: FAILED (exit {proc.returncode})\n{proc.stderr[-2000:]}")
+            results.append({**context, "stage": name, "error": proc.stderr[-2000:]})
+            continue
+        record = {**context, **json.loads(lines[-1][len("BENCH_RESULT "):])}
+        results.append(record)
+
+        note = ""
+        before = previous.get(name)
+        if before and record["rows_per_s"]:
+            change = record["rows_per_s"] / before["rows_per_s"] - 1
+            note = f" | {change:+.0%} vs {before['revision']}"
+            if change < -REGRESSION_THRESHOLD:
+                note += "  << REGRESSION"
+        p50 = f"{record['p50_ms']:.2f}" if record["p50_ms"] is not None else "-"
+        p99 = f"{record['p99_ms']:.2f}" if record["p99_ms"] is not None else "-"
+        rss = f"{record['peak_rss_mb']:.0f} MB" if record["peak_rss_mb"] is not None else "-"
+        print(
+            f"{name:>11}: {record['rows']:>10,} rows {record['rows_per_s']:>12,.0f} rows/s | "
+            f"p50 {p50} ms p99 {p99} ms | peak RSS {rss}{note}"
+        )
+
+    os.makedirs(os.path.dirname(results_path) or ".", exist_ok=True)
+    with open(results_path, "a", encoding="utf-8") as f:
+        for record in results:
+            f.write(json.dumps(record) + "\n")
+    return results
+
+
+if __name__ == "__main__":
+    commands = ("ingest", "bots", "pipeline", "replies", "prompts", "generate", "suite", "stage")
+    if len(sys.argv) < 2 or sys.argv[1] not in commands:
+        print(__doc__)
+        sys.exit(1)
+    if sys.argv[1] == "ingest":
+        bench_ingest(int(sys.argv[2]) if len(sys.argv) > 2 else 20000)
+    elif sys.argv[1] == "bots":
+        bench_bots(int(sys.argv[2]) if len(sys.argv) > 2 else 100000)
+    elif sys.argv[1] == "pipeline":
+        bench_pipeline(int(sys.argv[2]) if len(sys.argv) > 2 else 8)
+    elif sys.argv[1] == "replies":
+        bench_replies(int(sys.argv[2]) if len(sys.argv) > 2 else 5000)
+    elif sys.argv[1] == "prompts":
+        bench_prompts(int(sys.argv[2]) if len(sys.argv) > 2 else 6000)
+    elif sys.argv[1] == "generate":
+        print(build_synthetic_db(sys.argv[2], int(sys.argv[3])))
+    elif sys.argv[1] == "suite":
+        bench_suite(int(sys.argv[2]) if len(sys.argv) > 2 else 10000, sys.argv[3:] or SUITE_STAGES)
+    elif sys.argv[1] == "stage":
+        # child process of bench_suite: python benchmark.py stage <name> <db> <n_rows>
+        result = run_stage(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        print("BENCH_RESULT " + json.dumps(result))
@@ -0,0 +1,177 @@
+"""
+Rule-based bot scoring that fills tweets.not_bot.
+
+Accounts are scored in chunks of users (keyset on user_id), so memory is bounded
+by the chunk size, not the DB size. Three vectorized rules each add one hit:
+  - follow ratio: follows many accounts but almost nobody follows back
+  - tweets per day since account_created_at is implausibly high
+  - posting bursts: many collected tweets by the same user within a short window
+An account with BOT_MIN_HITS or more hits gets not_bot = 0, everyone else 1.
+
+    python bot_scoring.py path/to/tweets.db [chunk_users]
+"""
+import sys
+import time
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from tweets_schema import migrate, require_users_split, table_columns
+from tweet_ingest import apply_ingest_profile
+
+CHUNK_USERS = 50000             # users (and all their tweets) loaded per chunk
+
+MIN_FOLLOW_RATIO = 0.05         # followers / following below this is suspicious ...
+MIN_FOLLOWING = 500             # ... but only for accounts following at least this many
+MAX_TWEETS_PER_DAY = 144        # lifetime average above this (one per 10 minutes, all day)
+BURST_WINDOW_SECONDS = 60       # sliding window for posting bursts
+BURST_MAX_TWEETS = 5            # more collected tweets than this inside one window is a burst
+BOT_MIN_HITS = 2                # rules an account must trip to be marked as a bot
+
+
+# ============================================================
+# Loading
+# ============================================================
+def ensure_not_bot_column(conn):
+    """Adds tweets.not_bot if missing and re-runs migrate() so idx_tweets_accepted exists."""
+    if "not_bot" not in table_columns(conn, "tweets"):
+        with conn:
+            conn.execute("ALTER TABLE tweets ADD COLUMN not_bot INTEGER")
+    migrate(conn)
+
+
+def iter_user_chunks(conn, chunk_users=CHUNK_USERS):
+    """Yields DataFrames of users in user_id order, chunk_users rows at a time."""
+    last = ""
+    while True:
+        users = pd.read_sql_query(
+            """SELECT user_id, followers_count, following_count, tweet_count,
+                      account_created_at, metrics_observed_at
+               FROM users WHERE user_id > ? ORDER BY user_id LIMIT ?""",
+            conn, params=(last, chunk_users)
+        )
+        if users.empty:
+            return
+        last = users["user_id"].iloc[-1]
+        yield users
+
+
+def load_tweet_times(conn, first_user, last_user):
+    """created_at of every tweet by users in [first_user, last_user] (uses idx_tweets_user_id)."""
+    return pd.read_sql_query(
+        "SELECT user_id, created_at FROM tweets WHERE user_id BETWEEN ? AND ?",
+        conn, params=(first_user, last_user)
+    )
+
+
+def to_epoch_seconds(values):
+    """ISO timestamps -> float seconds since epoch (NaN where missing or unparseable)."""
+    parsed = pd.to_datetime(values, utc=True, errors="coerce", format="ISO8601")
+    seconds = (parsed - pd.Timestamp(0, tz="UTC")) / pd.Timedelta(seconds=1)
+    return np.asarray(seconds, dtype=float)
+
+
+# ============================================================
+# Features
+# ============================================================
+def account_features(users):
+    """Adds follow_ratio and tweets_per_day columns to a users chunk."""
+    followers = users["followers_count"].fillna(0).to_numpy(dtype=float)
+    following = users["following_count"].fillna(0).to_numpy(dtype=float)
+    tweets = users["tweet_count"].fillna(0).to_numpy(dtype=float)
+
+    created = to_epoch_seconds(users["account_created_at"])
+    observed = to_epoch_seconds(users["metrics_observed_at"])
+    observed = np.where(np.isnan(observed), time.time(), observed)
+    age_days = np.maximum((observed - created) / 86400.0, 1.0)
+
+    users["follow_ratio"] = followers / np.maximum(following, 1.0)
+    users["tweets_per_day"] = np.where(np.isnan(age_days), 0.0, tweets / age_days)
+    return users
+
+
+def max_burst(user_ids, times, window=BURST_WINDOW_SECONDS):
+    """
+    Largest number of tweets any one user posted within `window` seconds.
+    Returns a Series indexed by user_id. Rows are sorted by (user, time) and a
+    searchsorted over user-offset timestamps counts each tweet's window in one pass.
+    """
+    ok = ~np.isnan(times)
+    codes, uniques = pd.factorize(user_ids[ok])
+    if len(codes) == 0:
+        return pd.Series(dtype=float)
+    t = times[ok]
+    t = t - t.min()
+    # push every user into their own time range so windows never cross users
+    key = codes * (t.max() + 2.0 * window + 1.0) + t
+    order = np.argsort(key, kind="stable")
+    key = key[order]
+    in_window = np.arange(len(key)) - np.searchsorted(key, key - window, side="left") + 1
+    burst = np.zeros(len(uniques), dtype=np.int64)
+    np.maximum.at(burst, codes[order], in_window)
+    return pd.Series(burst, index=uniques)
+
+
+def score_chunk(users, tweet_times):
+    """Returns users with hits and not_bot columns for one chunk."""
+    users = account_features(users)
+    burst = max_burst(tweet_times["user_id"].to_numpy(), to_epoch_seconds(tweet_times["created_at"]))
+    users["max_burst"] = users["user_id"].map(burst).fillna(0).to_numpy()
+
+    following = users["following_count"].fillna(0).to_numpy()
+    hits = (
+        ((users["follow_ratio"].to_numpy() < MIN_FOLLOW_RATIO) & (following >= MIN_FOLLOWING)).astype(int)
+        + (users["tweets_per_day"].to_numpy() > MAX_TWEETS_PER_DAY).astype(int)
+        + (users["max_burst"].to_numpy() > BURST_MAX_TWEETS).astype(int)
+    )
+    users["hits"] = hits
+    users["not_bot"] = (hits < BOT_MIN_HITS).astype(int)
+    return users
+
+
+# ============================================================
+# Write-back
+# ============================================================
+def score_bots(conn, chunk_users=CHUNK_USERS, on_chunk=None):
+    """
+    Scores every user and writes not_bot onto their tweets, one transaction per
+    chunk. Tweets whose user_id has no users row are left untouched.
+    on_chunk(n_users, seconds), if given, is called after each chunk.
+    Returns (users scored, bots found).
+    """
+    ensure_not_bot_column(conn)
+    require_users_split(conn)
+    n_users = 0
+    n_bots = 0
+    start = time.perf_counter()
+    for users in iter_user_chunks(conn, chunk_users):
+        chunk_start = time.perf_counter()
+        tweet_times = load_tweet_times(conn, users["user_id"].iloc[0], users["user_id"].iloc[-1])
+        scored = score_chunk(users, tweet_times)
+        updates = list(zip(scored["not_bot"].tolist(), scored["user_id"].tolist()))
+        with conn:
+            conn.executemany(
+                "UPDATE tweets SET not_bot = ? WHERE user_id = ? AND not_bot IS NOT ?",
+                [(flag, uid, flag) for flag, uid in updates]
+            )
+        n_users += len(scored)
+        n_bots += int((scored["not_bot"] == 0).sum())
+        if on_chunk:
+            on_chunk(len(scored), time.perf_counter() - chunk_start)
+        elapsed = time.perf_counter() - start
+        print(f"   {n_users} users scored, {n_bots} bots ({n_users / elapsed:.0f} users/s)")
+    return n_users, n_bots
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    conn = sqlite3.connect(sys.argv[1])
+    try:
+        apply_ingest_profile(conn)
+        migrate(conn)
+        score_bots(conn, int(sys.argv[2]) if len(sys.argv) > 2 else CHUNK_USERS)
+    finally:
+        conn.close()
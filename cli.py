@@ -0,0 +1,290 @@
+"""
+Headless entry point for the pipeline stages (no file pickers, no GUI).
+
+    python cli.py sentiment --db tweets.db [--model NAME_OR_DIR] [--backend eager] [--workers 4] [--warm-model]
+    python cli.py definitions --db tweets.db --csv words.csv [--max-in-flight 8] [--prompt-mode compact]
+    python cli.py count --db tweets.db --csv phrases.csv [--no-excel]
+    python cli.py analytics --db tweets.db [--out results.csv] [--no-cache]
+    python cli.py export --db tweets.db --out export_dir [--format arrow] [--excel summary.xlsx]
+    python cli.py migrate --db tweets.db [--vacuum]
+    python cli.py bots --db tweets.db [--chunk-users 50000]
+    python cli.py backfill --db tweets.db [--chunk-size 20000]
+    python cli.py replies --db tweets.db [--accepted-only] [--max-in-flight 4] [--fake]
+    python cli.py warm [--model NAME_OR_DIR] [--backend int8]
+    python cli.py pipeline --db tweets.db --csv words.csv [--sets sets.json] [--sequential] [--fake] [--prompt-mode compact]
+
+Each stage module is imported only when its command runs, and the heavy
+libraries (torch/transformers, pandas, pyarrow, google.generativeai, tkinter) are
+imported inside those modules only where they are used.
+"""
+import os
+import sys
+import json
+import sqlite3
+import argparse
+
+from scripts import load_script, V3_SCRIPT
+
+
+def set_sentiment_model(args):
+    # read by sentiment_analysis at import, and inherited by its spawned workers
+    if args.model:
+        os.environ["SENTIMENT_MODEL"] = args.model
+    if args.backend:
+        os.environ["SENTIMENT_BACKEND"] = args.backend
+
+
+# ============================================================
+# Commands
+# ============================================================
+def cmd_sentiment(args):
+    set_sentiment_model(args)
+    import sentiment_analysis
+    sentiment_analysis.main(
+        args.db, args.chunk_size or sentiment_analysis.REPLY_CHUNK_SIZE, args.workers, args.threads, warm=args.warm_model
+    )
+
+
+def cmd_warm(args):
+    set_sentiment_model(args)
+    import sentiment_analysis
+    seconds = sentiment_analysis.warm_model()
+    print(f"Loaded {sentiment_analysis.MODEL_NAME} ({sentiment_analysis.BACKEND}) in {seconds:.1f}s")
+
+
+def cmd_definitions(args):
+    import GeminiTweetDefinitionQueryV2 as gemini
+    kwargs = {"max_in_flight": args.max_in_flight or gemini.MAX_IN_FLIGHT, "prompt_mode": args.prompt_mode}
+    if args.model_name:
+        kwargs["model_name"] = args.model_name
+    if args.api_key:
+        kwargs["api_key"] = args.api_key
+    gemini.run_analysis(args.db, gemini.read_word_map(args.csv), **kwargs)
+
+
+def cmd_count(args):
+    load_script(V3_SCRIPT).main(args.db, args.csv, excel=not args.no_excel)
+
+
+def cmd_analytics(args):
+    from hierarchy_analytics import analyze, N_BOOT
+    conn = sqlite3.connect(args.db)
+    try:
+        table = analyze(conn, n_boot=args.n_boot or N_BOOT, use_cache=not args.no_cache)
+    finally:
+        conn.close()
+    if args.out:
+        if args.out.endswith(".parquet"):
+            table.to_parquet(args.out, index=False)
+        else:
+            table.to_csv(args.out, index=False)
+        print(f"Saved {args.out}")
+    else:
+        print(table.to_string(index=False))
+
+
+def cmd_export(args):
+    from tweet_export import export_db, EXPORT_CHUNK_ROWS
+    export_db(args.db, args.out, args.format, args.chunk_rows or EXPORT_CHUNK_ROWS, excel_path=args.excel)
+
+
+def cmd_migrate(args):
+    from tweets_schema import migrate
+    conn = sqlite3.connect(args.db)
+    try:
+        before = conn.execute("PRAGMA user_version").fetchone()[0]
+        migrate(conn, split=True)
+        after = conn.execute("PRAGMA user_version").fetchone()[0]
+        if args.vacuum:
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+    print(f"Schema version {before} -> {after}")
+
+
+def cmd_bots(args):
+    from bot_scoring import score_bots, CHUNK_USERS
+    from tweet_ingest import apply_ingest_profile
+    from tweets_schema import migrate
+    conn = sqlite3.connect(args.db)
+    try:
+        apply_ingest_profile(conn)
+        migrate(conn)
+        score_bots(conn, args.chunk_users or CHUNK_USERS)
+    finally:
+        conn.close()
+
+
+def cmd_backfill(args):
+    from term_matcher import backfill_term_present, BACKFILL_CHUNK_SIZE
+    from tweet_ingest import apply_ingest_profile
+    conn = sqlite3.connect(args.db)
+    try:
+        apply_ingest_profile(conn)
+        backfill_term_present(conn, args.chunk_size or BACKFILL_CHUNK_SIZE)
+    finally:
+        conn.close()
+
+
+def cmd_replies(args):
+    import reply_harvester
+    from tweet_ingest import apply_ingest_profile
+    from tweets_schema import migrate
+    from search_scheduler import TokenBucket, make_header_tracking_client
+
+    if args.fake:
+        from fakes import FakeTwitterClient
+        client = FakeTwitterClient(latency=0.05)
+    else:
+        client = make_header_tracking_client(
+            bearer_token=args.bearer_token or os.environ.get("TWITTER_BEARER_TOKEN", ""), wait_on_rate_limit=False
+        )
+    conn = sqlite3.connect(args.db)
+    try:
+        apply_ingest_profile(conn)
+        migrate(conn)
+        reply_harvester.harvest_replies(
+            conn, client,
+            accepted_only=args.accepted_only,
+            max_in_flight=args.max_in_flight or reply_harvester.MAX_IN_FLIGHT,
+            bucket=TokenBucket(args.requests_per_window or reply_harvester.REQUESTS_PER_WINDOW),
+            max_query_length=args.max_query_length or reply_harvester.MAX_QUERY_LENGTH,
+        )
+    finally:
+        conn.close()
+
+
+def cmd_pipeline(args):
+    import pipeline
+    import GeminiTweetDefinitionQueryV2 as gemini
+    from search_scheduler import build_query, make_header_tracking_client
+
+    word_map = gemini.read_word_map(args.csv)
+    if args.sets:
+        with open(args.sets, encoding="utf-8") as f:
+            semantic_sets = json.load(f)
+    else:
+        # every phrase is its own one-term hierarchy
+        semantic_sets = {"phrases": [[phrase] for phrase in word_map]}
+
+    if args.fake:
+        from fakes import FakeTwitterClient, FakeGeminiModel
+        client = FakeTwitterClient(latency=0.05)
+        model = FakeGeminiModel(latency=0.05)
+    else:
+        import google.generativeai as genai
+        api_key = gemini.require_api_key(args.api_key)
+        client = make_header_tracking_client(
+            bearer_token=args.bearer_token or os.environ.get("TWITTER_BEARER_TOKEN", ""), wait_on_rate_limit=False
+        )
+        genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(gemini.MODEL_NAME)
+
+    pipeline.run_pipeline(
+        args.db, client, semantic_sets, word_map, model,
+        lambda term: build_query(term, args.exclude),
+        days_back=args.days_back,
+        schedule_kwargs={"max_results": args.max_results},
+        overlap=not args.sequential,
+        prompt_mode=args.prompt_mode,
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run a pipeline stage without the GUI file pickers.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("sentiment", help="score replies and write mean sentiment onto tweets")
+    p.add_argument("--db", required=True)
+    p.add_argument("--model", help="Hugging Face model name or local model directory")
+    p.add_argument("--backend", choices=("eager", "int8", "torchscript", "onnx"))
+    p.add_argument("--workers", type=int, default=1)
+    p.add_argument("--threads", type=int, help="torch threads per worker")
+    p.add_argument("--chunk-size", type=int)
+    p.add_argument("--warm-model", action="store_true", help="load the model before reading the DB")
+    p.set_defaults(func=cmd_sentiment)
+
+    p = sub.add_parser("warm", help="load (and download / build backends for) the sentiment model, then exit")
+    p.add_argument("--model")
+    p.add_argument("--backend", choices=("eager", "int8", "torchscript", "onnx"))
+    p.set_defaults(func=cmd_warm)
+
+    p = sub.add_parser("definitions", help="score corr_def with Gemini")
+    p.add_argument("--db", required=True)
+    p.add_argument("--csv", required=True, help="phrase,definition rows")
+    p.add_argument("--model-name")
+    p.add_argument("--api-key", help="defaults to GEMINI_API_KEY")
+    p.add_argument("--max-in-flight", type=int)
+    p.add_argument("--prompt-mode", choices=("verbose", "compact"), default="verbose",
+                   help="verbose: the original prompt; compact: numbered lines and a JSON answer")
+    p.set_defaults(func=cmd_definitions)
+
+    p = sub.add_parser("count", help="fill final_ammount per phrase (V3) and save the Excel file")
+    p.add_argument("--db", required=True)
+    p.add_argument("--csv", required=True, help="CSV with a 'phrase' column")
+    p.add_argument("--no-excel", action="store_true", help="save the filled CSV as Parquet instead of Excel")
+    p.set_defaults(func=cmd_count)
+
+    p = sub.add_parser("analytics", help="engagement / sentiment statistics per semantic set and hierarchy level")
+    p.add_argument("--db", required=True)
+    p.add_argument("--out", help=".csv or .parquet; prints the table when omitted")
+    p.add_argument("--n-boot", type=int, help="bootstrap resamples per group")
+    p.add_argument("--no-cache", action="store_true", help="recompute every group")
+    p.set_defaults(func=cmd_analytics)
+
+    p = sub.add_parser("export", help="stream tweets and per-term summary to partitioned Parquet / Arrow")
+    p.add_argument("--db", required=True)
+    p.add_argument("--out", required=True, help="output directory")
+    p.add_argument("--format", choices=("parquet", "arrow"), default="parquet")
+    p.add_argument("--chunk-rows", type=int)
+    p.add_argument("--excel", help="also write the summary to this .xlsx file")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("migrate", help="upgrade the schema, moving author columns out of tweets into users")
+    p.add_argument("--db", required=True)
+    p.add_argument("--vacuum", action="store_true", help="reclaim the space of the dropped columns")
+    p.set_defaults(func=cmd_migrate)
+
+    p = sub.add_parser("bots", help="score accounts and fill tweets.not_bot")
+    p.add_argument("--db", required=True)
+    p.add_argument("--chunk-users", type=int)
+    p.set_defaults(func=cmd_bots)
+
+    p = sub.add_parser("replies", help="harvest replies of collected tweets by conversation_id")
+    p.add_argument("--db", required=True)
+    p.add_argument("--accepted-only", action="store_true", help="only tweets with term_present = 1 and corr_def = 1")
+    p.add_argument("--max-in-flight", type=int)
+    p.add_argument("--requests-per-window", type=int)
+    p.add_argument("--max-query-length", type=int, help="1024 with Pro access")
+    p.add_argument("--bearer-token", help="defaults to TWITTER_BEARER_TOKEN")
+    p.add_argument("--fake", action="store_true", help="offline run against fakes.FakeTwitterClient")
+    p.set_defaults(func=cmd_replies)
+
+    p = sub.add_parser("pipeline", help="collect, score and count with the stages overlapped")
+    p.add_argument("--db", required=True)
+    p.add_argument("--csv", required=True, help="phrase,definition rows; the phrases are also the search terms")
+    p.add_argument("--sets", help="JSON {semantic_set: [[term, ...], ...]} instead of one set of the CSV phrases")
+    p.add_argument("--days-back", type=int, nargs="+", default=[7])
+    p.add_argument("--max-results", type=int, default=100)
+    p.add_argument("--exclude", nargs="*", default=[], help="terms to exclude from every search")
+    p.add_argument("--bearer-token", help="defaults to TWITTER_BEARER_TOKEN")
+    p.add_argument("--api-key", help="defaults to GEMINI_API_KEY")
+    p.add_argument("--sequential", action="store_true", help="run the stages one after another")
+    p.add_argument("--prompt-mode", choices=("verbose", "compact"), default="verbose")
+    p.add_argument("--fake", action="store_true", help="offline run against fakes.py stand-ins")
+    p.set_defaults(func=cmd_pipeline)
+
+    p = sub.add_parser("backfill", help="recompute usnmtext / term_present")
+    p.add_argument("--db", required=True)
+    p.add_argument("--chunk-size", type=int)
+    p.set_defaults(func=cmd_backfill)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,140 @@
+"""
+Per-(term, time slice) checkpoints for the TweetSearch collector.
+
+collection_state remembers, for every search term and slice start, the
+newest and oldest tweet ids saved so far, the next_token of an unfinished
+pagination and whether the slice is complete. A rerun skips complete slices
+(zero API calls), resumes unfinished ones from their next_token, and only
+asks for tweets newer than newest_id (since_id) when a slice's end time has
+moved forward since it was completed.
+"""
+from datetime import datetime, timezone
+
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+COMPLETE = "complete"
+
+
+def ensure_state_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS collection_state (
+            search_term TEXT NOT NULL,
+            slice_start TEXT NOT NULL,
+            slice_end TEXT,
+            newest_id TEXT,
+            oldest_id TEXT,
+            next_token TEXT,
+            since_id TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            pages INTEGER NOT NULL DEFAULT 0,
+            tweets INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT,
+            PRIMARY KEY (search_term, slice_start)
+        )
+    """)
+    conn.commit()
+
+
+def _key(job):
+    return job.term, job.start_time.isoformat()
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def load_state(conn, job):
+    row = conn.execute(
+        """SELECT slice_end, newest_id, oldest_id, next_token, since_id, status
+           FROM collection_state WHERE search_term = ? AND slice_start = ?""",
+        _key(job)
+    ).fetchone()
+    if row is None:
+        return None
+    return dict(zip(("slice_end", "newest_id", "oldest_id", "next_token", "since_id", "status"), row))
+
+
+def plan_request(conn, job):
+    """
+    Returns the extra search_recent_tweets parameters for the job's first
+    request on this run, or None when nothing is missing for the slice.
+    """
+    state = load_state(conn, job)
+    if state is None:
+        return {}
+
+    extra = {}
+    if state["status"] == COMPLETE:
+        if state["slice_end"] and state["slice_end"] >= job.end_time.isoformat():
+            return None
+        # the slice has grown since it was finished: fetch only tweets newer than what we have
+        if state["newest_id"]:
+            extra["since_id"] = state["newest_id"]
+        conn.execute(
+            """UPDATE collection_state SET status = ?, since_id = ?, next_token = NULL, updated_at = ?
+               WHERE search_term = ? AND slice_start = ?""",
+            (IN_PROGRESS, extra.get("since_id"), _now()) + _key(job)
+        )
+        conn.commit()
+        return extra
+
+    if state["since_id"]:
+        extra["since_id"] = state["since_id"]
+    if state["next_token"]:
+        extra["next_token"] = state["next_token"]
+    return extra
+
+
+def record_page(conn, job, response, extra):
+    """
+    Folds one page into the slice's checkpoint. Does not commit, so the caller
+    can commit it in the same transaction as the page's tweets.
+    """
+    meta = response.meta or {}
+    ids = [int(t.id) for t in (response.data or [])]
+    if meta.get("newest_id"):
+        ids.append(int(meta["newest_id"]))
+    if meta.get("oldest_id"):
+        ids.append(int(meta["oldest_id"]))
+
+    state = load_state(conn, job) or {}
+    newest_ids = ids + ([int(state["newest_id"])] if state.get("newest_id") else [])
+    oldest_ids = ids + ([int(state["oldest_id"])] if state.get("oldest_id") else [])
+    newest = str(max(newest_ids)) if newest_ids else None
+    oldest = str(min(oldest_ids)) if oldest_ids else None
+
+    conn.execute(
+        """INSERT INTO collection_state
+               (search_term, slice_start, slice_end, newest_id, oldest_id, next_token, since_id,
+                status, pages, tweets, updated_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?, ?)
+           ON CONFLICT(search_term, slice_start) DO UPDATE SET
+               slice_end = excluded.slice_end,
+               newest_id = excluded.newest_id,
+               oldest_id = excluded.oldest_id,
+               next_token = excluded.next_token,
+               since_id = excluded.since_id,
+               status = excluded.status,
+               pages = pages + 1,
+               tweets = tweets + excluded.tweets,
+               updated_at = excluded.updated_at""",
+        _key(job) + (
+            job.end_time.isoformat(), newest, oldest, meta.get("next_token"), extra.get("since_id"),
+            IN_PROGRESS, len(response.data or []), _now(),
+        )
+    )
+
+
+def mark_complete(conn, job):
+    conn.execute(
+        """INSERT INTO collection_state (search_term, slice_start, slice_end, status, updated_at)
+           VALUES (?, ?, ?, ?, ?)
+           ON CONFLICT(search_term, slice_start) DO UPDATE SET
+               slice_end = excluded.slice_end,
+               next_token = NULL,
+               since_id = NULL,
+               status = excluded.status,
+               updated_at = excluded.updated_at""",
+        _key(job) + (job.end_time.isoformat(), COMPLETE, _now())
+    )
+    conn.commit()
@@ -0,0 +1,523 @@
+"""
+Offline stand-ins for the remote services the scripts talk to, so runs can be
+timed and checked without API keys or network access.
+"""
+import os
+import re
+import json
+import time
+import zlib
+import random
+import sqlite3
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+
+# ==========================================
+# GEMINI
+# ==========================================
+
+class FakeUsage:
+    """Shaped like GenerateContentResponse.usage_metadata."""
+
+    def __init__(self, prompt_token_count, candidates_token_count, cached_content_token_count=0):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.cached_content_token_count = cached_content_token_count
+
+
+class FakeResponse:
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+def fake_tokens(text):
+    """~4 characters per token, like the estimate the scripts pack batches with."""
+    return len(text) // 4 + 1 if text else 0
+
+
+def default_prob(text):
+    """Deterministic stand-in score: the same text always gets the same prob."""
+    return 1.0 if zlib.crc32(str(text).encode("utf-8")) % 3 else 0.0
+
+
+class FakeGeminiModel:
+    """
+    Drop-in for genai.GenerativeModel in run_analysis().
+    Every call sleeps `latency` seconds and fails with a 429 (ResourceExhausted)
+    with probability `failure_rate`; otherwise it answers one line per tweet in
+    the prompt, in the format the real prompt asks for. Each line is left out
+    with probability `drop_rate` to mimic partial / mismatched responses.
+
+    with_system_instruction() returns a view with fixed instructions attached,
+    answering numbered "<n>|text" prompts with a JSON object as the compact
+    prompt asks. Every response carries usage_metadata. A system instruction
+    seen before is reported as cached_content_token_count, like Gemini 2.5's
+    implicit caching of a repeated prefix.
+    """
+
+    def __init__(self, latency=0.05, failure_rate=0.0, seed=0, scorer=default_prob, drop_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.drop_rate = drop_rate
+        self.scorer = scorer
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._seen_instructions = set()
+
+    def with_system_instruction(self, system_instruction, generation_config=None):
+        return FakeContextModel(self, system_instruction, generation_config)
+
+    def generate_content(self, prompt):
+        return self._generate(prompt)
+
+    def _generate(self, prompt, system_instruction=None, json_output=False):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = self._rng.random() < self.failure_rate
+            keep_draws = [self._rng.random() for _ in range(prompt.count("\n"))]
+            cached = 0
+            if system_instruction:
+                if system_instruction in self._seen_instructions:
+                    cached = fake_tokens(system_instruction)
+                self._seen_instructions.add(system_instruction)
+        try:
+            time.sleep(self.latency)
+            if fail:
+                with self._lock:
+                    self.failures += 1
+                import google.api_core.exceptions
+                raise google.api_core.exceptions.ResourceExhausted("429 Resource has been exhausted (fake)")
+            text = self.answer_json(prompt, keep_draws) if json_output else self.answer(prompt, keep_draws)
+            usage = FakeUsage(fake_tokens(system_instruction) + fake_tokens(prompt), fake_tokens(text), cached)
+            return FakeResponse(text, usage)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def answer(self, prompt, keep_draws=()):
+        tweets = re.findall(r"^ID: (\S+) \| Tweet: (.*)$", prompt, flags=re.MULTILINE)
+        lines = []
+        for i, (tid, text) in enumerate(tweets):
+            if i < len(keep_draws) and keep_draws[i] < self.drop_rate:
+                continue
+            lines.append(f"ID: {tid} | Prob: {self.scorer(text)}")
+        return "\n".join(lines)
+
+    def answer_json(self, prompt, keep_draws=()):
+        tweets = re.findall(r"^(\d+)\|(.*)$", prompt, flags=re.MULTILINE)
+        answer = {}
+        for i, (n, text) in enumerate(tweets):
+            if i < len(keep_draws) and keep_draws[i] < self.drop_rate:
+                continue
+            answer[n] = self.scorer(text)
+        return json.dumps(answer, separators=(",", ":"))
+
+
+class FakeContextModel:
+    """FakeGeminiModel with a phrase's system instruction attached; shares the parent's counters."""
+
+    def __init__(self, parent, system_instruction, generation_config=None):
+        self.parent = parent
+        self.system_instruction = system_instruction
+        self.json_output = (generation_config or {}).get("response_mime_type") == "application/json"
+
+    def generate_content(self, prompt):
+        return self.parent._generate(prompt, self.system_instruction, self.json_output)
+
+
+# ==========================================
+# TWITTER
+# ==========================================
+
+# Same field layout as tweepy.Response
+FakeSearchResponse = namedtuple("FakeSearchResponse", ["data", "includes", "errors", "meta"])
+
+_WORDS = (
+    "the a of and to in is it that for on with as was this at by be just really "
+    "today people think know new good time love day never about would could"
+).split()
+
+
+class FakeTweet:
+    def __init__(self, id, text, author_id, created_at, public_metrics, conversation_id=None):
+        self.id = id
+        self.text = text
+        self.author_id = author_id
+        self.created_at = created_at
+        self.public_metrics = public_metrics
+        self.conversation_id = conversation_id if conversation_id is not None else id
+
+
+class FakeUser:
+    def __init__(self, id, username, name, created_at, public_metrics):
+        self.id = id
+        self.username = username
+        self.name = name
+        self.created_at = created_at
+        self.public_metrics = public_metrics
+
+
+def synthetic_text(rng, term, min_words=4, max_words=45):
+    """Random tweet-like text; usually contains term, sometimes only as part of a longer word."""
+    return synthetic_text_flagged(rng, term, rng.randint(min_words, max_words))[0]
+
+
+def synthetic_text_flagged(rng, term, n_words):
+    """synthetic_text with a fixed word count; also returns whether term occurs as a whole word."""
+    words = [rng.choice(_WORDS) for _ in range(n_words)]
+    present = False
+    if term:
+        roll = rng.random()
+        form = term if roll < 0.8 else (term + "ation" if roll < 0.9 else None)
+        if form:
+            words.insert(rng.randrange(len(words) + 1), form)
+            present = form == term
+    if rng.random() < 0.3:
+        words.insert(0, f"@user{rng.randrange(1000)}")
+    return " ".join(words), present
+
+
+def synthetic_response(term, n, rng, start_id=10**17, n_users=None, now=None):
+    """
+    Builds a search_recent_tweets-shaped response with n tweets mentioning term
+    and their authors in includes["users"].
+    """
+    now = now or datetime.now(timezone.utc)
+    n_users = n_users or max(1, n // 2)
+    users = {}
+    tweets = []
+    for i in range(n):
+        author_id = rng.randrange(n_users)
+        if author_id not in users:
+            users[author_id] = FakeUser(
+                author_id,
+                f"user{author_id}",
+                f"User {author_id}",
+                now - timedelta(days=rng.randint(1, 4000)),
+                {
+                    "followers_count": rng.randint(0, 50000),
+                    "following_count": rng.randint(0, 5000),
+                    "tweet_count": rng.randint(1, 200000),
+                },
+            )
+        tweets.append(FakeTweet(
+            start_id + i,
+            synthetic_text(rng, term),
+            author_id,
+            now - timedelta(seconds=rng.randint(11, 7 * 86400)),
+            {
+                "like_count": int(rng.paretovariate(1.5)) - 1,
+                "retweet_count": int(rng.paretovariate(2.0)) - 1,
+                "reply_count": int(rng.paretovariate(2.0)) - 1,
+            },
+        ))
+    return FakeSearchResponse(tweets, {"users": list(users.values())}, [], {"result_count": n})
+
+
+class FakeHTTPResponse:
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = headers
+
+
+class FakeTooManyRequests(Exception):
+    """Shaped like tweepy.TooManyRequests: .response.status_code == 429 plus rate-limit headers."""
+
+    def __init__(self, headers):
+        super().__init__("429 Too Many Requests (fake)")
+        self.response = FakeHTTPResponse(429, headers)
+
+
+class FakeTwitterClient:
+    """
+    Stand-in for tweepy.Client.search_recent_tweets with a fixed-window rate limit.
+
+    Each query has a deterministic corpus of tweets_per_query tweets (newest id
+    first) that is paged with next_token and filtered by since_id / until_id
+    like the real endpoint. A query made of conversation_id:<id> operators
+    instead returns the replies in those conversations, a deterministic
+    expovariate(replies_per_conversation) number per conversation whatever the
+    batching. Past requests_per_window calls per window it raises
+    FakeTooManyRequests; x-rate-limit-* headers of the last call on each thread
+    are available from rate_limit_headers().
+    """
+
+    def __init__(self, requests_per_window=450, window=900.0, latency=0.0, tweets_per_query=250, seed=0,
+                 replies_per_conversation=3.0):
+        self.requests_per_window = requests_per_window
+        self.window = window
+        self.latency = latency
+        self.tweets_per_query = tweets_per_query
+        self.seed = seed
+        self.replies_per_conversation = replies_per_conversation
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._window_start = time.time()
+        self._window_calls = 0
+        self._corpora = {}
+        self.calls = 0
+        self.rejected = 0
+
+    def _conversation(self, conversation_id):
+        """(replies, users by id) of one conversation; never includes the root tweet."""
+        rng = random.Random(zlib.crc32(conversation_id.encode("utf-8")) + self.seed)
+        n = min(999, int(rng.expovariate(1.0 / self.replies_per_conversation))) if self.replies_per_conversation else 0
+        if not n:
+            return [], {}
+        # reply ids derived from the conversation's so batches never collide
+        root = int(conversation_id) if conversation_id.isdigit() else zlib.crc32(conversation_id.encode("utf-8"))
+        response = synthetic_response(None, n, rng, start_id=root * 1000 + 1)
+        # author ids restart in every conversation; keep them apart
+        for user in response.includes["users"]:
+            user.id = f"{conversation_id}-{user.id}"
+        for tweet in response.data:
+            tweet.conversation_id = int(conversation_id) if conversation_id.isdigit() else conversation_id
+            tweet.author_id = f"{conversation_id}-{tweet.author_id}"
+        return response.data, {u.id: u for u in response.includes["users"]}
+
+    def _corpus(self, query):
+        with self._lock:
+            if query not in self._corpora:
+                conversation_ids = re.findall(r"conversation_id:(\S+?)(?=[\s)]|$)", query)
+                if conversation_ids:
+                    tweets, users = [], {}
+                    for conversation_id in conversation_ids:
+                        replies, authors = self._conversation(conversation_id)
+                        tweets.extend(replies)
+                        users.update(authors)
+                    tweets.sort(key=lambda t: t.id, reverse=True)
+                    self._corpora[query] = (tweets, users)
+                    return self._corpora[query]
+                match = re.search(r'"([^"]+)"', query)
+                term = match.group(1) if match else query
+                key = zlib.crc32(query.encode("utf-8"))
+                rng = random.Random(key + self.seed)
+                response = synthetic_response(
+                    term, self.tweets_per_query, rng, start_id=10**17 + (key % 100000) * 10**6
+                )
+                tweets = sorted(response.data, key=lambda t: t.id, reverse=True)
+                users = {u.id: u for u in response.includes["users"]}
+                self._corpora[query] = (tweets, users)
+            return self._corpora[query]
+
+    def _take_slot(self):
+        with self._lock:
+            now = time.time()
+            if now - self._window_start >= self.window:
+                self._window_start = now
+                self._window_calls = 0
+            reset = int(self._window_start + self.window) + 1
+            if self._window_calls >= self.requests_per_window:
+                self.rejected += 1
+                raise FakeTooManyRequests({
+                    "x-rate-limit-limit": str(self.requests_per_window),
+                    "x-rate-limit-remaining": "0",
+                    "x-rate-limit-reset": str(reset),
+                })
+            self._window_calls += 1
+            self.calls += 1
+            self._local.headers = {
+                "x-rate-limit-limit": str(self.requests_per_window),
+                "x-rate-limit-remaining": str(self.requests_per_window - self._window_calls),
+                "x-rate-limit-reset": str(reset),
+            }
+
+    def rate_limit_headers(self):
+        return getattr(self._local, "headers", None)
+
+    def search_recent_tweets(self, query, max_results=10, next_token=None, since_id=None, until_id=None, **kwargs):
+        self._take_slot()
+        if self.latency:
+            time.sleep(self.latency)
+
+        tweets, users = self._corpus(query)
+        if since_id is not None:
+            tweets = [t for t in tweets if t.id > int(since_id)]
+        if until_id is not None:
+            tweets = [t for t in tweets if t.id < int(until_id)]
+
+        offset = int(next_token) if next_token else 0
+        page = tweets[offset:offset + max_results]
+        meta = {"result_count": len(page)}
+        if page:
+            meta["newest_id"] = str(page[0].id)
+            meta["oldest_id"] = str(page[-1].id)
+        if offset + max_results < len(tweets):
+            meta["next_token"] = str(offset + max_results)
+
+        page_users = list({t.author_id: users[t.author_id] for t in page}.values())
+        return FakeSearchResponse(page or None, {"users": page_users}, [], meta)
+
+
+# ==========================================
+# SENTIMENT MODEL
+# ==========================================
+
+def build_tiny_sentiment_model(directory, seed=0):
+    """
+    Saves a randomly initialised 2-layer RoBERTa sequence classifier (3 labels)
+    and a byte-level BPE tokenizer trained on the synthetic vocabulary into
+    directory, unless one is already there. Point sentiment_analysis.py at it
+    with SENTIMENT_MODEL=<directory>. Returns directory.
+    """
+    if os.path.exists(os.path.join(directory, "config.json")):
+        return directory
+    import torch
+    from tokenizers import ByteLevelBPETokenizer
+    from tokenizers.processors import RobertaProcessing
+    from transformers import PreTrainedTokenizerFast, RobertaConfig, RobertaForSequenceClassification
+
+    os.makedirs(directory, exist_ok=True)
+    torch.manual_seed(seed)
+    rng = random.Random(seed)
+    specials = ["<s>", "<pad>", "</s>", "<unk>", "<mask>"]
+    bpe = ByteLevelBPETokenizer()
+    bpe.train_from_iterator((synthetic_text(rng, "") for _ in range(2000)), vocab_size=400, special_tokens=specials)
+    bpe._tokenizer.post_processor = RobertaProcessing(("</s>", 2), ("<s>", 0))
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=bpe._tokenizer, bos_token="<s>", eos_token="</s>", pad_token="<pad>",
+        unk_token="<unk>", mask_token="<mask>", model_max_length=512
+    )
+    config = RobertaConfig(
+        vocab_size=len(tokenizer), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=64, num_labels=3, max_position_embeddings=514, pad_token_id=tokenizer.pad_token_id
+    )
+    tokenizer.save_pretrained(directory)
+    RobertaForSequenceClassification(config).save_pretrained(directory)
+    return directory
+
+
+# ==========================================
+# SYNTHETIC DATABASE
+# ==========================================
+
+SYNTHETIC_TERMS = (
+    "tax", "horse", "canyon", "geological formation", "cephalopod", "tariff", "possession",
+    "import", "mare", "gorge", "levy", "squid", "octopus", "stallion", "ravine", "duty",
+    "bluff", "mesa", "pony", "excise", "cuttlefish", "butte", "colt", "toll", "nautilus",
+)
+
+
+def zipf_weights(n, skew=1.1):
+    return [1.0 / (rank + 1) ** skew for rank in range(n)]
+
+
+def build_synthetic_db(path, n_tweets, replies_per_tweet=2.0, duplicate_share=0.1, pending_share=0.05,
+                       bot_share=0.05, terms=SYNTHETIC_TERMS, seed=0, chunk_rows=50000):
+    """
+    Writes a tweets/users/replies DB shaped like a real collection run:
+      - search terms drawn with Zipf skew (a few terms dominate)
+      - text lengths log-normally spread between 1 and 60 words
+      - duplicate_share of tweets and replies copy an earlier text (retweet-style)
+      - pending_share of term-matching tweets still have corr_def NULL
+      - bot_share of authors follow many / are followed by few and post in bursts
+    term_present / usnmtext are filled like the collector would. Existing rows
+    are kept (INSERT OR IGNORE), so re-running with the same seed is a no-op.
+    Returns (tweets, replies) written.
+    """
+    from tweets_schema import CREATE_TWEETS_SQL, CREATE_USERS_SQL, CREATE_REPLIES_SQL, migrate
+    from tweet_ingest import INSERT_TWEET_SQL, apply_ingest_profile, strip_leading_handles
+
+    rng = random.Random(seed)
+    now = int(time.time())
+    weights = zipf_weights(len(terms))
+    n_users = max(1, n_tweets // 5)
+    recent = {}     # term -> up to 1000 earlier (text, present) pairs to copy from
+
+    def text_for(term):
+        recent_texts = recent.setdefault(term, [])
+        if recent_texts and rng.random() < duplicate_share:
+            return rng.choice(recent_texts)
+        n_words = max(1, min(60, int(rng.lognormvariate(2.5, 0.6))))
+        text, present = synthetic_text_flagged(rng, term, n_words)
+        if len(recent_texts) < 1000:
+            recent_texts.append((text, present))
+        else:
+            recent_texts[rng.randrange(1000)] = (text, present)
+        return text, present
+
+    conn = sqlite3.connect(path)
+    apply_ingest_profile(conn)
+    conn.execute(CREATE_TWEETS_SQL)
+    conn.execute(CREATE_USERS_SQL)
+    conn.execute(CREATE_REPLIES_SQL)
+    conn.commit()
+    migrate(conn)
+
+    users = []
+    user_bot = []
+    user_base = []
+    for u in range(n_users):
+        bot = rng.random() < bot_share
+        user_bot.append(bot)
+        user_base.append(now - rng.randint(3600, 7 * 86400))
+        users.append((
+            str(u), f"user{u}", f"User {u}",
+            rng.randint(0, 50) if bot else int(rng.paretovariate(1.2) * 50),
+            rng.randint(1000, 5000) if bot else rng.randint(10, 2000),
+            rng.randint(1, 200000),
+            time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(now - rng.randint(30, 4000) * 86400)),
+            time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(now)),
+        ))
+        if len(users) >= chunk_rows:
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?, ?, ?, ?, ?)", users)
+            users = []
+    with conn:
+        conn.executemany("INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?, ?, ?, ?, ?)", users)
+
+    def stamp(seconds):
+        return time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(seconds))
+
+    n_replies = 0
+    reply_id = 10**18
+    tweets = []
+    replies = []
+    for i in range(n_tweets):
+        term_idx = rng.choices(range(len(terms)), weights)[0]
+        term = terms[term_idx]
+        text, present = text_for(term)
+        u = min(n_users - 1, int(rng.paretovariate(1.0)) - 1) if rng.random() < 0.3 else rng.randrange(n_users)
+        if user_bot[u]:
+            created = user_base[u] + rng.randint(0, 300)
+        else:
+            created = now - rng.randint(11, 7 * 86400)
+        corr_def = None
+        if present and rng.random() >= pending_share:
+            corr_def = 1.0 if rng.random() < 0.7 else 0.0
+        tweet_id = str(10**17 + i)
+        tweets.append((
+            tweet_id, f"set{term_idx // 5}", term_idx % 5, term,
+            text, strip_leading_handles(text), 1 if present else 0, corr_def,
+            stamp(created),
+            int(rng.paretovariate(1.5)) - 1, int(rng.paretovariate(2.0)) - 1, int(rng.paretovariate(2.0)) - 1,
+            None, str(u)
+        ))
+
+        k = int(rng.expovariate(1.0 / replies_per_tweet) + 0.5) if replies_per_tweet > 0 else 0
+        for _ in range(k):
+            reply_text = text_for(None)[0]
+            replies.append((
+                str(reply_id), tweet_id, tweet_id, reply_text,
+                stamp(created + rng.randint(1, 86400)), str(rng.randrange(n_users))
+            ))
+            reply_id += 1
+        n_replies += k
+
+        if len(tweets) >= chunk_rows or i == n_tweets - 1:
+            with conn:
+                conn.executemany(INSERT_TWEET_SQL, tweets)
+                conn.executemany("INSERT OR IGNORE INTO replies VALUES (?, ?, ?, ?, ?, ?)", replies)
+            tweets = []
+            replies = []
+    conn.close()
+    return n_tweets, n_replies
@@ -0,0 +1,304 @@
+"""
+Engagement and reply-sentiment statistics of the accepted tweets
+(corr_def = 1, not_bot = 1) per semantic set and lexical hierarchy level.
+
+Groups are every (semantic_set, lexical_hierarchy) partition plus the
+roll-ups per set, per level and overall ("*" stands for all). For each group
+and each metric: n, mean, std, quantiles, max, share of zeros and a bootstrap
+confidence interval of the mean. reply_ratio = replies / (likes + 1) is the
+usual "ratio" proxy for a controversial tweet.
+
+Results are cached in analytics_cache, keyed by a fingerprint of each group's
+accepted rows (an aggregate per partition that one indexed query computes).
+A rerun on an unchanged DB only runs that query; after new rows or scores,
+only the groups whose partitions changed are recomputed, and only those
+partitions are loaded.
+
+    python hierarchy_analytics.py path/to/tweets.db [--no-cache] [--out results.csv|.parquet]
+"""
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from tweets_schema import migrate, table_columns
+
+ANALYTICS_VERSION = 1           # bump when the statistics change; invalidates every cached group
+N_BOOT = 1000                   # bootstrap resamples per group
+CONFIDENCE = 0.95               # two-sided interval of the bootstrapped mean
+BOOTSTRAP_MAX_CELLS = 1000000   # resampled rows held at once (resamples are drawn in blocks)
+QUANTILES = (0.25, 0.5, 0.75, 0.9, 0.99)
+ALL = "*"
+
+ENGAGEMENT_METRICS = ("like_count", "retweet_count", "reply_count", "reply_ratio")
+SENTIMENT_METRIC = "sentiment_score"
+
+# NULL set / level collapse onto '' / -1, as in the accepted-count summary
+PARTITION_SQL = "IFNULL(semantic_set, '') AS semantic_set, IFNULL(lexical_hierarchy, -1) AS lexical_hierarchy"
+ACCEPTED_SQL = "corr_def = 1.0 AND not_bot = 1"
+
+# cheap content fingerprint per partition: row count, sums and rowid-weighted sums
+# (the weighting catches values that moved between rows)
+FINGERPRINT_SQL = f"""
+    SELECT {PARTITION_SQL},
+           COUNT(*), MAX(rowid), TOTAL(rowid),
+           TOTAL(like_count), TOTAL(retweet_count), TOTAL(reply_count),
+           COUNT(sentiment_score), TOTAL(sentiment_score),
+           TOTAL(rowid * (IFNULL(like_count, 0) + 3 * IFNULL(retweet_count, 0) + 7 * IFNULL(reply_count, 0))),
+           TOTAL(rowid * sentiment_score)
+    FROM tweets
+    WHERE {ACCEPTED_SQL}
+    GROUP BY 1, 2
+"""
+
+
+# ============================================================
+# Cache
+# ============================================================
+def ensure_cache_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_cache (
+            group_key TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            result TEXT NOT NULL,
+            computed_at TEXT
+        )
+    """)
+    conn.commit()
+
+
+def group_key(group):
+    return json.dumps(list(group))
+
+
+def partition_fingerprints(conn):
+    """{(semantic_set, lexical_hierarchy): hex digest of the partition's accepted rows}."""
+    return {
+        (row[0], row[1]): hashlib.sha1(repr(row[2:]).encode("utf-8")).hexdigest()
+        for row in conn.execute(FINGERPRINT_SQL)
+    }
+
+
+def analysis_groups(partitions):
+    """{group: [member partitions]} for the partitions and their set / level / overall roll-ups."""
+    groups = {}
+    for semantic_set, level in partitions:
+        for group in ((semantic_set, level), (semantic_set, ALL), (ALL, level), (ALL, ALL)):
+            groups.setdefault(group, []).append((semantic_set, level))
+    return groups
+
+
+def group_fingerprint(members, fingerprints, params):
+    digest = hashlib.sha1(repr((ANALYTICS_VERSION, params)).encode("utf-8"))
+    for partition in sorted(members, key=repr):
+        digest.update(fingerprints[partition].encode("utf-8"))
+    return digest.hexdigest()
+
+
+# ============================================================
+# Loading
+# ============================================================
+def load_accepted(conn, partitions=None):
+    """
+    Accepted rows as a DataFrame (set, level, engagement counts, reply_ratio,
+    sentiment_score), optionally only from the given partitions.
+    """
+    sql = f"""SELECT {PARTITION_SQL}, like_count, retweet_count, reply_count, sentiment_score
+              FROM tweets WHERE {ACCEPTED_SQL}"""
+    params = []
+    if partitions is not None:
+        partitions = list(partitions)
+        if not partitions:
+            return pd.DataFrame(columns=["semantic_set", "lexical_hierarchy", *ENGAGEMENT_METRICS, SENTIMENT_METRIC])
+        sql += (
+            " AND (IFNULL(semantic_set, ''), IFNULL(lexical_hierarchy, -1)) IN (VALUES "
+            + ", ".join("(?, ?)" for _ in partitions) + ")"
+        )
+        params = [value for partition in partitions for value in partition]
+    df = pd.read_sql_query(sql, conn, params=params)
+    for col in ("like_count", "retweet_count", "reply_count"):
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(np.int64)
+    df[SENTIMENT_METRIC] = pd.to_numeric(df[SENTIMENT_METRIC], errors="coerce")
+    df["reply_ratio"] = df["reply_count"] / (df["like_count"] + 1.0)
+    return df
+
+
+# ============================================================
+# Statistics
+# ============================================================
+def describe(frame, by, metrics):
+    """n / mean / std / max / share_zero / quantiles of metrics per `by` group, one groupby each."""
+    keys = [frame[col] for col in by] if by else np.zeros(len(frame))
+    values = frame[metrics]
+    grouped = values.groupby(keys, sort=False)
+    parts = [
+        grouped.count().add_suffix("_n"),
+        grouped.mean().add_suffix("_mean"),
+        grouped.std().add_suffix("_std"),
+        grouped.max().add_suffix("_max"),
+        (values == 0).where(values.notna()).groupby(keys, sort=False).mean().add_suffix("_share_zero"),
+    ]
+    quantiles = grouped.quantile(list(QUANTILES)).unstack(level=-1)
+    quantiles.columns = [f"{metric}_p{round(q * 100)}" for metric, q in quantiles.columns]
+    parts.append(quantiles)
+    return pd.concat(parts, axis=1)
+
+
+def bootstrap_mean_ci(values, n_boot=N_BOOT, confidence=CONFIDENCE, rng=None):
+    """
+    Percentile bootstrap interval of the column means of values (n x m); NaNs
+    are left out of their column's mean. Each block of resamples becomes a
+    (resamples x n) matrix of draw counts, so the means are one matmul.
+    Returns (low, high) arrays of length m (NaN where a column has < 2 values).
+    """
+    values = np.asarray(values, dtype=float)
+    n, m = values.shape
+    present = ~np.isnan(values)
+    low = np.full(m, np.nan)
+    high = np.full(m, np.nan)
+    if n < 2:
+        return low, high
+    rng = rng or np.random.default_rng()
+    filled = np.where(present, values, 0.0)
+    present = present.astype(float)
+    means = np.empty((n_boot, m))
+    block = max(1, BOOTSTRAP_MAX_CELLS // n)
+    for start in range(0, n_boot, block):
+        b = min(block, n_boot - start)
+        idx = rng.integers(0, n, size=(b, n)) + (np.arange(b) * n)[:, None]
+        counts = np.bincount(idx.ravel(), minlength=b * n).reshape(b, n).astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means[start:start + b] = (counts @ filled) / (counts @ present)
+    alpha = (1.0 - confidence) / 2.0
+    enough = present.sum(axis=0) >= 2
+    low[enough] = np.nanquantile(means[:, enough], alpha, axis=0)
+    high[enough] = np.nanquantile(means[:, enough], 1.0 - alpha, axis=0)
+    return low, high
+
+
+def group_seed(group, seed):
+    # per-group seed: a group's interval does not depend on which other groups were recomputed
+    return zlib.crc32(group_key(group).encode("utf-8")) ^ seed
+
+
+def compute_groups(df, groups, n_boot=N_BOOT, confidence=CONFIDENCE, seed=0):
+    """{group: {statistic: value}} for the requested groups, from the loaded rows."""
+    metrics = list(ENGAGEMENT_METRICS) + [SENTIMENT_METRIC]
+    levels = {
+        "partition": ["semantic_set", "lexical_hierarchy"],
+        "set": ["semantic_set"],
+        "level": ["lexical_hierarchy"],
+        "all": [],
+    }
+    wanted = {}
+    for group in groups:
+        kind = "all" if group == (ALL, ALL) else "set" if group[1] == ALL else "level" if group[0] == ALL else "partition"
+        wanted.setdefault(kind, []).append(group)
+
+    results = {}
+    for kind, kind_groups in wanted.items():
+        by = levels[kind]
+        table = describe(df, by, metrics)
+        for group in kind_groups:
+            index = {"partition": group, "set": group[0], "level": group[1], "all": 0.0}[kind]
+            row = table.loc[index] if index in table.index else {}
+            results[group] = {name: float(value) for name, value in dict(row).items()}
+
+        # bootstrap per group (all metrics in one resample); rows are picked with a boolean mask
+        for group in kind_groups:
+            mask = np.ones(len(df), dtype=bool)
+            if group[0] != ALL:
+                mask &= (df["semantic_set"] == group[0]).to_numpy()
+            if group[1] != ALL:
+                mask &= (df["lexical_hierarchy"] == group[1]).to_numpy()
+            rng = np.random.default_rng(group_seed(group, seed))
+            low, high = bootstrap_mean_ci(df.loc[mask, metrics].to_numpy(dtype=float), n_boot, confidence, rng)
+            for metric, lo, hi in zip(metrics, low, high):
+                results[group][f"{metric}_mean_ci_low"] = float(lo)
+                results[group][f"{metric}_mean_ci_high"] = float(hi)
+    return results
+
+
+# ============================================================
+# Entry point
+# ============================================================
+def analyze(conn, n_boot=N_BOOT, confidence=CONFIDENCE, seed=0, use_cache=True):
+    """
+    Statistics for every group as a DataFrame (one row per group, sorted),
+    recomputing only groups whose accepted rows changed since the cached run.
+    """
+    if "not_bot" not in table_columns(conn, "tweets"):
+        raise RuntimeError("tweets has no not_bot column yet; run bot_scoring.py first.")
+    start = time.perf_counter()
+    ensure_cache_table(conn)
+    params = (n_boot, confidence, seed)
+    fingerprints = partition_fingerprints(conn)
+    groups = analysis_groups(fingerprints)
+    group_fps = {group: group_fingerprint(members, fingerprints, params) for group, members in groups.items()}
+
+    cached = {}
+    if use_cache:
+        for key, fingerprint, result in conn.execute("SELECT group_key, fingerprint, result FROM analytics_cache"):
+            cached[key] = (fingerprint, result)
+    results = {}
+    stale = []
+    for group, fingerprint in group_fps.items():
+        hit = cached.get(group_key(group))
+        if hit and hit[0] == fingerprint:
+            results[group] = json.loads(hit[1])
+        else:
+            stale.append(group)
+
+    loaded = 0
+    if stale:
+        needed = sorted({p for group in stale for p in groups[group]}, key=repr)
+        df = load_accepted(conn, needed if len(needed) < len(fingerprints) else None)
+        loaded = len(df)
+        fresh = compute_groups(df, stale, n_boot, confidence, seed)
+        now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        with conn:
+            conn.executemany(
+                """INSERT INTO analytics_cache (group_key, fingerprint, result, computed_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(group_key) DO UPDATE SET
+                       fingerprint = excluded.fingerprint, result = excluded.result, computed_at = excluded.computed_at""",
+                [(group_key(g), group_fps[g], json.dumps(fresh[g]), now) for g in stale]
+            )
+            # groups whose partitions no longer have accepted rows
+            keys = {group_key(g) for g in groups}
+            conn.executemany(
+                "DELETE FROM analytics_cache WHERE group_key = ?",
+                [(key,) for key in cached if key not in keys]
+            )
+        results.update(fresh)
+
+    print(f"Analytics: {len(groups)} groups, {len(stale)} recomputed from {loaded} rows, "
+          f"{len(groups) - len(stale)} cached ({time.perf_counter() - start:.2f}s)")
+    rows = [{"semantic_set": g[0], "lexical_hierarchy": g[1], **results[g]} for g in groups]
+    out = pd.DataFrame(rows)
+    return out.sort_values(["semantic_set", "lexical_hierarchy"], key=lambda s: s.astype(str)).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    flags = sys.argv[2:]
+    conn = sqlite3.connect(sys.argv[1])
+    try:
+        migrate(conn)
+        table = analyze(conn, use_cache="--no-cache" not in flags)
+    finally:
+        conn.close()
+    if "--out" in flags:
+        out_path = flags[flags.index("--out") + 1]
+        table.to_parquet(out_path, index=False) if out_path.endswith(".parquet") else table.to_csv(out_path, index=False)
+        print(f"Saved {out_path}")
+    else:
+        cols = ["semantic_set", "lexical_hierarchy", "reply_ratio_n", "reply_ratio_mean",
+                "reply_ratio_mean_ci_low", "reply_ratio_mean_ci_high", "sentiment_score_mean"]
+        print(table[cols].to_string(index=False))
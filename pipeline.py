@@ -0,0 +1,463 @@
+"""
+Streaming mode: collection, corr_def scoring and reply sentiment run at the same time.
+
+    collect ──q──> define ──q──> sentiment ──> bots + final counts
+    (search pages,   (Gemini batches     (replies of accepted
+     term matching)   per phrase)         tweets)
+
+Each stage is a thread with its own SQLite connection (WAL, busy timeout) and
+the queues between them are bounded, so a slow stage blocks the one before it
+instead of buffering without limit. Queues only carry tweet ids and text; the
+table is the source of truth. On start, rows a crashed run left half-way are
+queued again from their per-row state: term_present = 1 AND corr_def IS NULL for
+definitions, accepted tweets with replies and no sentiment_score for sentiment.
+Collection resumes from collection_state.
+"""
+import time
+import queue
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+
+import GeminiTweetDefinitionQueryV2 as gemini
+from tweets_schema import CREATE_TWEETS_SQL, CREATE_USERS_SQL, ensure_replies_table, migrate, require_users_split
+from tweet_ingest import apply_ingest_profile, tweet_rows, user_rows, IngestMeter
+from term_matcher import TermMatcher
+from collection_state import ensure_state_table, plan_request, record_page, mark_complete
+from search_scheduler import TokenBucket, build_work_list, run_schedule
+
+QUEUE_SIZE = 2000           # items buffered between two stages; a full queue blocks the stage upstream
+FLUSH_SECONDS = 2.0         # a phrase's partial definition batch is sent after waiting this long
+SENTIMENT_GROUP = 200       # accepted tweets whose replies are scored together
+SEED_CHUNK = 5000           # rows per read when re-queuing work left by an earlier run
+BUSY_TIMEOUT_MS = 30000     # stages share one DB file; writers wait for each other this long
+
+DONE = None                 # end-of-stream marker, one per producer
+
+# PENDING_SQL plus the rowid keyset, so seeding reads idx_tweets_pending in chunks
+SEED_PENDING_SQL = """
+    SELECT rowid, tweet_id, search_term, usnmtext FROM tweets
+    WHERE LOWER(TRIM(search_term)) = LOWER(TRIM(?))
+      AND term_present = 1
+      AND corr_def IS NULL
+      AND rowid > ? AND rowid <= ?
+    ORDER BY rowid LIMIT ?
+"""
+
+
+# ============================================================
+# Plumbing
+# ============================================================
+def connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+    apply_ingest_profile(conn)
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def put(q, item, stop):
+    """Blocking put that gives up once another stage has failed."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+    raise RuntimeError("pipeline stopped")
+
+
+class StageTimes:
+    """First and last time each stage did work, for the overlap report."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.spans = {}
+        self.items = {}
+
+    def touch(self, stage, n=1):
+        now = time.perf_counter()
+        with self.lock:
+            first, _ = self.spans.get(stage, (now, now))
+            self.spans[stage] = (first, now)
+            self.items[stage] = self.items.get(stage, 0) + n
+
+
+def stored_ids(conn, tweet_ids):
+    """The ids among tweet_ids that tweets already holds."""
+    found = set()
+    for i in range(0, len(tweet_ids), gemini.CACHE_LOOKUP_SIZE):
+        part = tweet_ids[i:i + gemini.CACHE_LOOKUP_SIZE]
+        found.update(t for (t,) in conn.execute(
+            f"SELECT tweet_id FROM tweets WHERE tweet_id IN ({','.join('?' * len(part))})", part
+        ))
+    return found
+
+
+def seed_rows(conn, sql, params, max_rowid):
+    """Yields rows of `sql` (selecting rowid first) with rowid <= max_rowid, in keyset chunks."""
+    last = 0
+    while True:
+        rows = conn.execute(sql, params + (last, max_rowid, SEED_CHUNK)).fetchall()
+        if not rows:
+            return
+        last = rows[-1][0]
+        yield rows
+
+
+# ============================================================
+# Stages
+# ============================================================
+def collect_stage(db_path, client, jobs, out_q, stop, times, matcher, schedule_kwargs):
+    """Runs the search schedule; every saved term-matching tweet is queued for definitions."""
+    conn = connect(db_path)
+    meter = IngestMeter()
+    try:
+        plans = {job: plan_request(conn, job) for job in jobs}
+        jobs = [job for job in jobs if plans[job] is not None]
+
+        def save_page(job, response, extra):
+            record_page(conn, job, response, extra)
+            if not response.data:
+                conn.commit()
+                return 0
+            users = {u.id: u for u in response.includes["users"]} if response.includes and "users" in response.includes else {}
+            rows = tweet_rows(response.data, users, job.semantic_set, job.term_idx, job.term, matcher)
+            # INSERT OR IGNORE keeps a tweet already stored (maybe under another search term),
+            # so only the rows this page actually inserts are queued
+            queued = stored_ids(conn, [str(row[0]) for row in rows])
+            inserted = meter.write(conn, rows, user_rows(users.values()))
+            conn.commit()
+            times.touch("collect", inserted)
+            # queued only after the commit, so the DB always holds at least what is in flight
+            for row in rows:
+                tweet_id = str(row[0])
+                if row[6] and tweet_id not in queued:      # term_present
+                    queued.add(tweet_id)
+                    put(out_q, (tweet_id, row[3], row[5]), stop)
+            return len(rows)
+
+        stats = run_schedule(
+            client, jobs, save_page, request_kwargs=plans.get,
+            on_done=lambda job: mark_complete(conn, job), **schedule_kwargs
+        )
+        print(f"[collect] {len(jobs)} requests planned, {stats['requests']} sent, {meter.rows} new tweets")
+    finally:
+        conn.close()
+
+
+def seed_definitions(db_path, word_map, out_q, stop, max_rowid):
+    """Queues tweets an earlier run inserted but never scored."""
+    conn = connect(db_path)
+    try:
+        n = 0
+        for phrase in word_map:
+            for rows in seed_rows(conn, SEED_PENDING_SQL, (phrase,), max_rowid):
+                for _, tweet_id, search_term, text in rows:
+                    put(out_q, (tweet_id, search_term, text), stop)
+                n += len(rows)
+        if n:
+            print(f"[define] re-queued {n} unscored tweets from an earlier run")
+    finally:
+        conn.close()
+
+
+def define_stage(db_path, word_map, model, model_name, in_q, out_q, stop, times, n_producers,
+                 max_in_flight, flush_seconds, prompt_mode=gemini.PROMPT_MODE):
+    """
+    Scores corr_def in per-phrase batches as tweets arrive. Input is only taken
+    while fewer than max_in_flight calls are outstanding (backpressure). Accepted
+    tweets (corr_def = 1.0) are queued for sentiment after their update commits.
+    """
+    conn = connect(db_path)
+    gemini.ensure_cache_table(conn)
+    definitions = {phrase.strip().lower(): (phrase, definition) for phrase, definition in word_map.items()}
+    buffers = {}            # phrase key -> [[(tweet_id, text)], first arrival time, estimated tokens]
+    in_flight = {}
+    resend = deque()
+    updates = []
+    cache_rows = []
+    producers_left = n_producers
+    contexts = gemini.PhraseContexts(model) if prompt_mode == "compact" else None
+    cache_model = gemini.cache_model_key(model_name, prompt_mode)
+
+    def still_pending(key, rows):
+        # skip anything already scored, or stored under another search term than this phrase
+        ids = [tid for tid, _ in rows]
+        found = set()
+        for i in range(0, len(ids), gemini.CACHE_LOOKUP_SIZE):
+            part = ids[i:i + gemini.CACHE_LOOKUP_SIZE]
+            found.update(t for (t,) in conn.execute(
+                f"""SELECT tweet_id FROM tweets
+                    WHERE corr_def IS NULL AND LOWER(TRIM(search_term)) = ?
+                      AND tweet_id IN ({','.join('?' * len(part))})""",
+                [key] + part
+            ))
+        return [row for row in rows if row[0] in found]
+
+    def dispatch(pool, key):
+        rows, _, _ = buffers.pop(key)
+        rows = still_pending(key, rows)
+        if not rows:
+            return
+        phrase, definition = definitions[key]
+        definition_hash = gemini.text_hash(gemini.normalize_text(definition))
+        groups, unique_rows = gemini.fold_duplicates(rows)
+        cached = gemini.lookup_cached(conn.cursor(), key, definition_hash, (h for h, _ in groups.values()), cache_model)
+        to_send = []
+        for tid, text in unique_rows:
+            h, ids = groups[str(tid)]
+            if h in cached:
+                updates.extend((cached[h], t) for t in ids)
+            else:
+                to_send.append((tid, text))
+        context = (key, definition_hash, groups)
+        for batch in gemini.pack_batches(to_send):
+            job = (phrase, definition, "stream", batch, 0, context)
+            in_flight[pool.submit(gemini.score_batch, model, phrase, definition, batch, contexts)] = job
+
+    def flush_writes():
+        accepted = [tid for prob, tid in updates if prob == 1.0]
+        n = len(updates)
+        gemini.write_updates(conn, updates, cache_rows)
+        times.touch("define", n)
+        for tid in accepted:
+            put(out_q, tid, stop)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            while producers_left or buffers or in_flight or resend:
+                if stop.is_set():
+                    raise RuntimeError("pipeline stopped")
+
+                while resend and len(in_flight) < max_in_flight:
+                    job = resend.popleft()
+                    in_flight[pool.submit(gemini.score_batch, model, *job[:2], job[3], contexts)] = job
+
+                # take input only while there is room for more calls; drain what is
+                # already queued, and block briefly only when nothing else is going on
+                got_input = False
+                while producers_left and len(in_flight) < max_in_flight:
+                    try:
+                        if got_input or in_flight:
+                            item = in_q.get_nowait()
+                        else:
+                            item = in_q.get(timeout=0.2)
+                    except queue.Empty:
+                        break
+                    got_input = True
+                    if item is DONE:
+                        producers_left -= 1
+                        continue
+                    tweet_id, search_term, text = item
+                    key = str(search_term).strip().lower()
+                    if key not in definitions:
+                        continue
+                    buffer = buffers.setdefault(key, [[], time.perf_counter(), 0])
+                    buffer[0].append((tweet_id, text))
+                    buffer[2] += gemini.estimate_tokens(text) + gemini.TOKENS_PER_TWEET_OVERHEAD
+                    if buffer[2] >= gemini.BATCH_TOKEN_BUDGET or len(buffer[0]) >= gemini.MAX_BATCH_TWEETS:
+                        dispatch(pool, key)
+
+                now = time.perf_counter()
+                for key in [k for k, (_, first, _) in buffers.items() if not producers_left or now - first >= flush_seconds]:
+                    if len(in_flight) >= max_in_flight and producers_left:
+                        break
+                    dispatch(pool, key)
+
+                if in_flight:
+                    timeout = None if not producers_left else (0 if got_input else 0.05)
+                    done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        phrase, definition, label, batch, depth, context = in_flight.pop(future)
+                        key, definition_hash, groups = context
+                        try:
+                            scored, missing = future.result()
+                        except Exception as e:
+                            print(f"   [{phrase}] stream batch error: {e}")
+                            continue
+                        for t_id, prob in scored:
+                            h, ids = groups[t_id]
+                            updates.extend((prob, t) for t in ids)
+                            cache_rows.append((key, definition_hash, h, cache_model, prob))
+                        if missing and depth < gemini.MAX_SPLIT_DEPTH:
+                            for part in gemini.split_missing(missing):
+                                resend.append((phrase, definition, label, part, depth + 1, context))
+
+                if len(updates) >= gemini.WRITE_GROUP_SIZE or (updates and not in_flight):
+                    flush_writes()
+        flush_writes()
+    finally:
+        if contexts is not None:
+            contexts.close()
+        conn.close()
+
+
+def seed_sentiment(db_path, out_q, stop, max_rowid):
+    """Queues accepted tweets an earlier run scored for corr_def but not for sentiment."""
+    conn = connect(db_path)
+    try:
+        sql = """SELECT rowid, tweet_id FROM tweets t
+                 WHERE corr_def = 1.0 AND sentiment_score IS NULL
+                 AND EXISTS (SELECT 1 FROM replies r WHERE r.parent_tweet_id = t.tweet_id)
+                 AND rowid > ? AND rowid <= ? ORDER BY rowid LIMIT ?"""
+        n = 0
+        for rows in seed_rows(conn, sql, (), max_rowid):
+            for _, tweet_id in rows:
+                put(out_q, tweet_id, stop)
+            n += len(rows)
+        if n:
+            print(f"[sentiment] re-queued {n} accepted tweets from an earlier run")
+    finally:
+        conn.close()
+
+
+def sentiment_stage(db_path, in_q, stop, times, n_producers, flush_seconds):
+    """Scores the replies of accepted tweets in groups and writes their mean sentiment."""
+    import sentiment_analysis
+    conn = connect(db_path)
+    sentiment_analysis.ensure_cache_table(conn)
+    group = []
+    first = None
+    producers_left = n_producers
+
+    def score_group():
+        sums = {}
+        counts = {}
+        for i in range(0, len(group), sentiment_analysis.CACHE_LOOKUP_SIZE):
+            part = group[i:i + sentiment_analysis.CACHE_LOOKUP_SIZE]
+            rows = conn.execute(
+                f"SELECT parent_tweet_id, text FROM replies WHERE parent_tweet_id IN ({','.join('?' * len(part))})", part
+            ).fetchall()
+            if not rows:
+                continue
+            scores, _ = sentiment_analysis.score_texts_cached(conn, [text for _, text in rows])
+            sentiment_analysis.accumulate_scores(sums, counts, [tid for tid, _ in rows], scores)
+        if sums:
+            sentiment_analysis.write_mean_sentiment(conn, sums, counts)
+        times.touch("sentiment", len(group))
+        group.clear()
+
+    try:
+        while producers_left:
+            if stop.is_set():
+                raise RuntimeError("pipeline stopped")
+            try:
+                item = in_q.get(timeout=0.2)
+            except queue.Empty:
+                item = False
+            if item is DONE:
+                producers_left -= 1
+            elif item:
+                if not group:
+                    first = time.perf_counter()
+                group.append(item)
+            if group and (len(group) >= SENTIMENT_GROUP or not producers_left
+                          or time.perf_counter() - first >= flush_seconds):
+                score_group()
+        if group:
+            score_group()
+    finally:
+        conn.close()
+
+
+def final_counts(db_path, word_map):
+    """Bot scoring over the whole table, then the V3 accepted count per phrase."""
+    from bot_scoring import score_bots
+    from scripts import load_script, V3_SCRIPT
+    v3 = load_script(V3_SCRIPT)
+    conn = connect(db_path)
+    try:
+        score_bots(conn)
+        phrases = list(enumerate(word_map))
+        counts = v3.count_accepted_all(conn, "tweets", phrases)
+        return {phrase: counts.get(i, 0) for i, phrase in phrases}
+    finally:
+        conn.close()
+
+
+# ============================================================
+# Runner
+# ============================================================
+def run_pipeline(db_path, client, semantic_sets, word_map, model, build_query, model_name=gemini.MODEL_NAME,
+                 days_back=(7,), slice_hour_utc=0, slice_minutes=1438, schedule_kwargs=None,
+                 max_in_flight=gemini.MAX_IN_FLIGHT, overlap=True, queue_size=QUEUE_SIZE,
+                 flush_seconds=FLUSH_SECONDS, prompt_mode=gemini.PROMPT_MODE):
+    """
+    Collects, scores and counts in one go. With overlap=False the same stages run
+    one after another with unbounded queues, which is the old run-each-script order.
+    Returns {phrase: accepted count}.
+    """
+    start = time.perf_counter()
+    conn = connect(db_path)
+    conn.execute(CREATE_TWEETS_SQL)
+    conn.execute(CREATE_USERS_SQL)
+    conn.commit()
+    migrate(conn)
+    require_users_split(conn)
+    ensure_state_table(conn)
+    ensure_replies_table(conn)
+    max_rowid = conn.execute("SELECT IFNULL(MAX(rowid), 0) FROM tweets").fetchone()[0]
+    conn.close()
+
+    size = queue_size if overlap else 0
+    define_q = queue.Queue(maxsize=size)
+    sentiment_q = queue.Queue(maxsize=size)
+    stop = threading.Event()
+    errors = []
+    times = StageTimes()
+    jobs = build_work_list(
+        semantic_sets, list(days_back), build_query, datetime.now(timezone.utc), slice_hour_utc, slice_minutes
+    )
+    matcher = TermMatcher.from_semantic_sets(semantic_sets)
+    schedule_kwargs = dict(schedule_kwargs or {})
+    schedule_kwargs.setdefault("bucket", TokenBucket(schedule_kwargs.pop("requests_per_window", 450)))
+
+    def thread(target, *args, done_q=None):
+        def run():
+            try:
+                target(*args)
+            except Exception as e:
+                if not stop.is_set():
+                    errors.append(f"{target.__name__}: {e!r}")
+                stop.set()
+            finally:
+                if done_q is not None:
+                    try:
+                        put(done_q, DONE, stop)
+                    except RuntimeError:
+                        pass
+        return threading.Thread(target=run, name=target.__name__, daemon=True)
+
+    groups = [
+        [
+            thread(seed_definitions, db_path, word_map, define_q, stop, max_rowid, done_q=define_q),
+            thread(collect_stage, db_path, client, jobs, define_q, stop, times, matcher, schedule_kwargs, done_q=define_q),
+        ],
+        [
+            thread(seed_sentiment, db_path, sentiment_q, stop, max_rowid, done_q=sentiment_q),
+            thread(define_stage, db_path, word_map, model, model_name, define_q, sentiment_q, stop, times, 2,
+                   max_in_flight, flush_seconds, prompt_mode, done_q=sentiment_q),
+        ],
+        [thread(sentiment_stage, db_path, sentiment_q, stop, times, 2, flush_seconds)],
+    ]
+    if overlap:
+        groups = [[t for g in groups for t in g]]
+    for group in groups:
+        for t in group:
+            t.start()
+        for t in group:
+            t.join()
+        if errors:
+            raise RuntimeError("Pipeline failed: " + "; ".join(errors))
+
+    counts = final_counts(db_path, word_map)
+    total = time.perf_counter() - start
+
+    print(f"\nPipeline ({'overlapped' if overlap else 'sequential'}) finished in {total:.1f}s")
+    for stage, (first, last) in times.spans.items():
+        print(f"   {stage:>9}: {times.items[stage]} rows, active {first - start:.1f}s .. {last - start:.1f}s")
+    for phrase, n in counts.items():
+        print(f"   {phrase}: {n} accepted")
+    return counts
@@ -0,0 +1,202 @@
+"""
+Thread-safe counters, gauges and histograms for the scoring pipelines.
+
+A run's metrics are exported as a JSON summary and as a Prometheus textfile
+(the node_exporter textfile collector format), so they can be scraped locally
+during or after a run. Both files are written atomically (temp file + rename).
+"""
+import os
+import json
+import math
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)   # seconds
+SIZE_BUCKETS = (500, 1000, 2000, 5000, 10000, 20000, 50000)          # chars / tokens
+MAX_SAMPLES = 50000     # raw values kept per histogram for percentiles (reservoir sampled past this)
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list (q in 0..100)."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = None
+        self.samples = []
+        self._rng = random.Random(0)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = value if self.max is None else max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(value)
+        else:
+            j = self._rng.randrange(self.count)
+            if j < MAX_SAMPLES:
+                self.samples[j] = value
+
+    def summary(self):
+        values = sorted(self.samples)
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+            "max": self.max,
+        }
+
+
+class Metrics:
+    """
+    Named metrics with optional labels, e.g.
+        metrics.inc("calls_total", outcome="ok")
+        with metrics.timer("db_seconds", op="write"): ...
+    Counters, gauges and histograms live in separate namespaces.
+    """
+
+    def __init__(self, prefix=""):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+            self.last_export = 0.0
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observes the wall-clock seconds spent in the with-block into histogram `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter_total(self, name, **match):
+        """Sum of counter `name` across all label sets that contain `match`."""
+        want = set((k, str(v)) for k, v in match.items())
+        with self.lock:
+            return sum(v for (n, labels), v in self.counters.items() if n == name and want <= set(labels))
+
+    def histogram_samples(self, name, **match):
+        """Raw (possibly reservoir-sampled) values of histogram `name` across matching label sets."""
+        want = set((k, str(v)) for k, v in match.items())
+        with self.lock:
+            return [x for (n, labels), h in self.histograms.items() if n == name and want <= set(labels) for x in h.samples]
+
+    def histogram_sum(self, name, **match):
+        want = set((k, str(v)) for k, v in match.items())
+        with self.lock:
+            return sum(h.sum for (n, labels), h in self.histograms.items() if n == name and want <= set(labels))
+
+    # ============================================================
+    # Export
+    # ============================================================
+    def snapshot(self):
+        """Plain-dict view of every metric, suitable for json.dump."""
+        def entries(items, value):
+            out = {}
+            for (name, labels), item in sorted(items, key=lambda kv: kv[0]):
+                out.setdefault(self.prefix + name, []).append({"labels": dict(labels), **value(item)})
+            return out
+
+        with self.lock:
+            return {
+                "started_at": self.started,
+                "elapsed_seconds": time.time() - self.started,
+                "counters": entries(self.counters.items(), lambda v: {"value": v}),
+                "gauges": entries(self.gauges.items(), lambda v: {"value": v}),
+                "histograms": entries(self.histograms.items(), lambda h: h.summary()),
+            }
+
+    def prometheus_text(self):
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        lines = []
+        typed = set()
+        with self.lock:
+            for kind, items in (("counter", self.counters), ("gauge", self.gauges)):
+                for (name, labels), value in sorted(items.items()):
+                    full = self.prefix + name
+                    if full not in typed:
+                        lines.append(f"# TYPE {full} {kind}")
+                        typed.add(full)
+                    lines.append(f"{full}{fmt(labels)} {value}")
+            for (name, labels), h in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                full = self.prefix + name
+                if full not in typed:
+                    lines.append(f"# TYPE {full} histogram")
+                    typed.add(full)
+                for bound, count in zip(h.buckets, h.counts):
+                    lines.append(f"{full}_bucket{fmt(labels, [('le', bound)])} {count}")
+                lines.append(f"{full}_bucket{fmt(labels, [('le', '+Inf')])} {h.count}")
+                lines.append(f"{full}_sum{fmt(labels)} {h.sum}")
+                lines.append(f"{full}_count{fmt(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, json_path=None, prom_path=None, extra=None):
+        """Writes the JSON summary (plus `extra` under "summary") and/or the Prometheus textfile."""
+        if json_path:
+            data = self.snapshot()
+            if extra:
+                data["summary"] = extra
+            write_atomic(json_path, json.dumps(data, indent=2, default=str))
+        if prom_path:
+            write_atomic(prom_path, self.prometheus_text())
+        self.last_export = time.time()
+
+    def export_due(self, interval):
+        return time.time() - self.last_export >= interval
+
+
+def write_atomic(path, text):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
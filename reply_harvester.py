@@ -0,0 +1,229 @@
+"""
+Fills replies(parent_tweet_id, text, ...) for the tweets the TweetSearch
+collector saved, so sentiment_analysis.py has replies to score.
+
+Replies are found with conversation_id:<tweet_id> searches. As many
+conversations as fit under MAX_QUERY_LENGTH are OR-ed into one query, and the
+batches are paginated through search_scheduler.run_schedule (bounded number
+of requests in flight, token bucket pacing, 429s retried after the reset).
+Each page's replies are written with one executemany.
+
+reply_state holds one checkpoint row per conversation. A rerun skips complete
+conversations and searches unfinished ones again from the first page
+(INSERT OR IGNORE drops the replies already saved). Recent search only covers
+the last 7 days, so older conversations come back empty and are marked
+complete. A collected tweet that is itself a reply starts no conversation of
+its own and gets no replies.
+
+    python reply_harvester.py path/to/tweets.db [--accepted-only]
+"""
+import sys
+import time
+import sqlite3
+from datetime import datetime, timezone
+
+from tweets_schema import CREATE_TWEETS_SQL, CREATE_USERS_SQL, ensure_replies_table, migrate
+from tweet_ingest import apply_ingest_profile
+from search_scheduler import SliceJob, TokenBucket, run_schedule, make_header_tracking_client
+
+BEARER_TOKEN = ""
+
+MAX_QUERY_LENGTH = 512          # search_recent_tweets query limit (1024 with Pro access)
+MAX_RESULTS = 100               # replies per page (the endpoint maximum)
+MAX_IN_FLIGHT = 4               # concurrent search requests
+REQUESTS_PER_WINDOW = 450       # search_recent_tweets limit per 15-minute window for this token
+QUERY_SUFFIX = " -is:retweet"
+PROGRESS_EVERY = 50             # batches between progress lines
+
+REPLY_TWEET_FIELDS = ["author_id", "created_at", "conversation_id"]
+
+PENDING = "pending"
+COMPLETE = "complete"
+
+INSERT_REPLY_SQL = """
+    INSERT OR IGNORE INTO replies (reply_id, parent_tweet_id, conversation_id, text, created_at, user_id)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+# one row per conversation; pages and replies accumulate over runs
+UPSERT_STATE_SQL = """
+    INSERT INTO reply_state (conversation_id, status, pages, replies, updated_at)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(conversation_id) DO UPDATE SET
+        status = excluded.status,
+        pages = pages + excluded.pages,
+        replies = replies + excluded.replies,
+        updated_at = excluded.updated_at
+"""
+
+
+# ===============================
+# Checkpoints
+# ===============================
+def ensure_reply_state_table(conn):
+    ensure_replies_table(conn)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS reply_state (
+            conversation_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT 'pending',
+            pages INTEGER NOT NULL DEFAULT 0,
+            replies INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT
+        )
+    """)
+    conn.commit()
+
+
+def pending_conversations(conn, accepted_only=False):
+    """
+    tweet_ids whose conversation has not been harvested yet, in id order.
+    Tweets the API reported with reply_count 0 are left out.
+    """
+    where = " AND t.term_present = 1 AND t.corr_def = 1.0" if accepted_only else ""
+    rows = conn.execute(
+        f"""SELECT t.tweet_id FROM tweets t
+            LEFT JOIN reply_state s ON s.conversation_id = t.tweet_id
+            WHERE (s.status IS NULL OR s.status != ?)
+              AND (t.reply_count IS NULL OR t.reply_count > 0){where}
+            ORDER BY t.tweet_id""",
+        (COMPLETE,)
+    ).fetchall()
+    return [str(row[0]) for row in rows]
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ===============================
+# Queries
+# ===============================
+def conversation_query(conversation_ids):
+    return "(" + " OR ".join(f"conversation_id:{cid}" for cid in conversation_ids) + ")" + QUERY_SUFFIX
+
+
+def pack_conversations(conversation_ids, max_length=MAX_QUERY_LENGTH):
+    """Greedily groups ids so each group's conversation_query() fits in max_length."""
+    batches = []
+    batch = []
+    length = len("()" + QUERY_SUFFIX)
+    for cid in conversation_ids:
+        term = len(f"conversation_id:{cid}") + (len(" OR ") if batch else 0)
+        if batch and length + term > max_length:
+            batches.append(batch)
+            batch = []
+            length = len("()" + QUERY_SUFFIX)
+            term = len(f"conversation_id:{cid}")
+        batch.append(cid)
+        length += term
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def reply_rows(tweets):
+    """Insert rows for one page; the root tweet of a conversation is not its own reply."""
+    rows = []
+    for tweet in tweets:
+        conversation_id = str(tweet.conversation_id)
+        if str(tweet.id) == conversation_id:
+            continue
+        rows.append((
+            str(tweet.id),
+            conversation_id,        # parent = the collected tweet that started the conversation
+            conversation_id,
+            tweet.text,
+            tweet.created_at.isoformat() if tweet.created_at else None,
+            str(tweet.author_id),
+        ))
+    return rows
+
+
+# ===============================
+# Harvest
+# ===============================
+def harvest_replies(conn, client, accepted_only=False, max_in_flight=MAX_IN_FLIGHT, bucket=None,
+                    max_query_length=MAX_QUERY_LENGTH, max_results=MAX_RESULTS):
+    """
+    Searches the replies of every pending conversation and writes them to replies.
+    Each page and its conversations' checkpoints are committed together; a
+    batch's conversations are marked complete after its last page.
+    Returns {"conversations", "replies", "batches", "requests", "rate_limited", "errors", "seconds"}.
+    """
+    ensure_reply_state_table(conn)
+    conversation_ids = pending_conversations(conn, accepted_only)
+    batches = pack_conversations(conversation_ids, max_query_length)
+    jobs = [
+        SliceJob(None, None, f"conversations batch {i}", conversation_query(batch), None, None, None)
+        for i, batch in enumerate(batches)
+    ]
+    batch_ids = {job: batch for job, batch in zip(jobs, batches)}
+    print(f"Harvesting replies of {len(conversation_ids)} conversations in {len(jobs)} queries, "
+          f"{max_in_flight} in flight")
+
+    totals = {"conversations": 0, "replies": 0, "batches": 0}
+    start = time.perf_counter()
+
+    def save_page(job, response, extra):
+        rows = reply_rows(response.data or [])
+        per_conversation = {}
+        for row in rows:
+            per_conversation[row[1]] = per_conversation.get(row[1], 0) + 1
+        with conn:
+            before = conn.total_changes
+            conn.executemany(INSERT_REPLY_SQL, rows)
+            inserted = conn.total_changes - before
+            now = _now()
+            conn.executemany(
+                UPSERT_STATE_SQL,
+                [(cid, PENDING, 1, per_conversation.get(cid, 0), now) for cid in batch_ids[job]]
+            )
+        totals["replies"] += inserted
+        return len(rows)
+
+    def finish_batch(job):
+        with conn:
+            conn.executemany(
+                "UPDATE reply_state SET status = ?, updated_at = ? WHERE conversation_id = ?",
+                [(COMPLETE, _now(), cid) for cid in batch_ids[job]]
+            )
+        totals["conversations"] += len(batch_ids[job])
+        totals["batches"] += 1
+        if totals["batches"] % PROGRESS_EVERY and totals["batches"] != len(jobs):
+            return
+        elapsed = time.perf_counter() - start
+        print(f"   {totals['conversations']}/{len(conversation_ids)} conversations, "
+              f"{totals['replies']} replies ({totals['replies'] / elapsed:.0f} replies/s)")
+
+    stats = run_schedule(
+        client,
+        jobs,
+        save_page,
+        max_results=max_results,
+        max_in_flight=max_in_flight,
+        bucket=bucket or TokenBucket(REQUESTS_PER_WINDOW),
+        paginate=True,
+        on_done=finish_batch,
+        tweet_fields=REPLY_TWEET_FIELDS,
+    )
+    return dict(totals, seconds=time.perf_counter() - start, **stats)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    conn = sqlite3.connect(sys.argv[1])
+    try:
+        apply_ingest_profile(conn)
+        conn.execute(CREATE_TWEETS_SQL)
+        conn.execute(CREATE_USERS_SQL)
+        conn.commit()
+        migrate(conn)
+        client = make_header_tracking_client(bearer_token=BEARER_TOKEN, wait_on_rate_limit=False)
+        result = harvest_replies(conn, client, accepted_only="--accepted-only" in sys.argv[2:])
+        print(f"Done: {result['replies']} new replies from {result['conversations']} conversations "
+              f"in {result['seconds']:.1f}s ({result['requests']} requests, "
+              f"{result['rate_limited']} rate limited, {result['errors']} errors)")
+    finally:
+        conn.close()
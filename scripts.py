@@ -0,0 +1,17 @@
+"""
+Loads the top-level scripts whose file names are not valid module names, so
+cli.py, pipeline.py and benchmark.py can reuse their functions.
+"""
+import os
+import importlib.util
+
+V3_SCRIPT = "V3 (tweets left over from filtering) bot detection AND corr_def numbering.py"
+
+
+def load_script(filename):
+    """Imports a script from this directory by file name."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(filename))[0], path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,264 @@
+"""
+Rate-limit-aware scheduler for search_recent_tweets.
+
+Builds the full (term, time slice) work list up front and runs it with a
+bounded number of requests in flight. A token bucket sized to the endpoint's
+request window paces the calls, and the x-rate-limit-* headers of every
+response (or of a 429) pull the bucket back in line with the server's count.
+Responses are handed to a callback on the calling thread, so the caller
+stays the only DB writer.
+"""
+import time
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta, timezone
+
+# search_recent_tweets with app-only auth: 450 requests per 15-minute window
+REQUESTS_PER_WINDOW = 450
+WINDOW_SECONDS = 15 * 60
+MAX_IN_FLIGHT = 4
+
+TWEET_FIELDS = ["author_id", "created_at", "public_metrics", "lang"]
+EXPANSIONS = ["author_id"]
+USER_FIELDS = ["username", "name", "public_metrics", "created_at"]
+
+SliceJob = namedtuple(
+    "SliceJob",
+    ["semantic_set", "term_idx", "term", "query", "day_back", "start_time", "end_time"],
+)
+
+
+# ===============================
+# Token bucket
+# ===============================
+class TokenBucket:
+    """
+    Allows `capacity` requests per `window` seconds, refilled continuously.
+    sync() and pause_until() apply what the server reports about the real window.
+    """
+
+    def __init__(self, capacity=REQUESTS_PER_WINDOW, window=WINDOW_SECONDS, clock=time.monotonic, sleep=time.sleep):
+        self.capacity = capacity
+        self.rate = capacity / window
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.paused_until = 0.0
+        self.window_resets_at = None
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        if self.window_resets_at is not None and now >= self.window_resets_at:
+            # the server started a new window: its full allowance is back
+            self.tokens = float(self.capacity)
+            self.window_resets_at = None
+        else:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        while True:
+            with self.lock:
+                now = self.clock()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = max(self.paused_until - now, (1 - self.tokens) / self.rate, 0.01)
+            self.sleep(wait_for)
+
+    def sync(self, remaining, reset_epoch):
+        """Never hold more tokens than the server says remain; stop until reset at zero."""
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            if remaining is not None:
+                self.tokens = min(self.tokens, float(remaining))
+            if reset_epoch is not None:
+                resets_at = now + max(0.0, reset_epoch - time.time())
+                self.window_resets_at = resets_at
+                if remaining == 0:
+                    self.paused_until = max(self.paused_until, resets_at)
+
+    def pause_until(self, reset_epoch):
+        self.sync(0, reset_epoch)
+
+
+def rate_limit_info(headers):
+    """Returns (remaining, reset epoch seconds) from x-rate-limit-* headers, or (None, None)."""
+    if not headers:
+        return None, None
+    remaining = headers.get("x-rate-limit-remaining")
+    reset = headers.get("x-rate-limit-reset")
+    return (
+        int(remaining) if remaining is not None else None,
+        float(reset) if reset is not None else None,
+    )
+
+
+def is_rate_limited(exc):
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+def make_header_tracking_client(**kwargs):
+    """
+    A tweepy.Client that remembers the headers of the last response on each
+    thread (tweepy otherwise drops them), readable through rate_limit_headers().
+    """
+    import tweepy
+
+    class HeaderTrackingClient(tweepy.Client):
+        _local = threading.local()
+
+        def request(self, *args, **kw):
+            response = super().request(*args, **kw)
+            self._local.headers = response.headers
+            return response
+
+        def rate_limit_headers(self):
+            return getattr(self._local, "headers", None)
+
+    return HeaderTrackingClient(**kwargs)
+
+
+# ===============================
+# Work list
+# ===============================
+def slice_bounds(script_start, day_back, slice_hour_utc, slice_minutes):
+    """
+    (start, end) of the sampling slice day_back days before script_start,
+    or None when the slice is empty. end is kept 10 s before now (API requirement).
+    """
+    day = (script_start - timedelta(days=day_back)).date()
+    slice_start = datetime(day.year, day.month, day.day, hour=slice_hour_utc, tzinfo=timezone.utc)
+    slice_end = slice_start + timedelta(minutes=slice_minutes)
+    if slice_end >= script_start - timedelta(seconds=10):
+        slice_end = script_start - timedelta(seconds=10)
+    if slice_start >= slice_end:
+        return None
+    return slice_start, slice_end
+
+
+def build_query(search_term, exclude_terms=(), exclude_accounts=()):
+    """Exact-phrase query without retweets, links or quotes, minus the excluded terms and accounts."""
+    query = f'"{search_term}" -is:retweet -has:links -is:quote'
+    for term in exclude_terms:
+        query += f' -"{term}"'
+    for account in exclude_accounts:
+        # tweets from the account or mentioning it
+        query += f" -from:{account} -@{account}"
+    return query
+
+
+def build_work_list(semantic_sets, days_back, build_query, script_start, slice_hour_utc, slice_minutes):
+    """One SliceJob per non-empty (term, day) pair, in collector order."""
+    jobs = []
+    for semantic_set, hierarchies in semantic_sets.items():
+        for hierarchy in hierarchies:
+            for term_idx, term in enumerate(hierarchy):
+                # Skip empty placeholders
+                if not term or not term.strip():
+                    continue
+                for day_back in days_back:
+                    bounds = slice_bounds(script_start, day_back, slice_hour_utc, slice_minutes)
+                    if bounds is None:
+                        print(f"  Skipping '{term}' day {day_back}: slice start >= slice end")
+                        continue
+                    jobs.append(SliceJob(semantic_set, term_idx, term, build_query(term), day_back, *bounds))
+    return jobs
+
+
+# ===============================
+# Scheduler
+# ===============================
+def run_schedule(client, jobs, on_page, max_results=100, max_in_flight=MAX_IN_FLIGHT,
+                 bucket=None, paginate=False, max_tweets_per_term=None, request_kwargs=None, on_done=None,
+                 tweet_fields=TWEET_FIELDS):
+    """
+    Runs every job against client.search_recent_tweets with at most
+    max_in_flight requests outstanding, paced by bucket.
+
+    on_page(job, response, extra) is called on this thread for each page, with
+    the extra request parameters that produced it, and returns how many
+    tweets it kept. With paginate=True, further pages of a slice are
+    requested while the response has a next_token and the term has fewer than
+    max_tweets_per_term kept tweets. request_kwargs(job) may add extra
+    parameters (since_id, until_id, next_token, ...) to a job's first request.
+    on_done(job) is called on this thread once a job's last page has been handled.
+    Jobs without a time slice (start_time / end_time None) search the whole
+    recent window.
+    Returns {"requests", "rate_limited", "errors"} counters.
+    """
+    bucket = bucket or TokenBucket()
+    term_totals = {}
+    term_in_flight = {}
+    stats = {"requests": 0, "rate_limited": 0, "errors": 0}
+
+    def fetch(job, extra):
+        bucket.acquire()
+        try:
+            response = client.search_recent_tweets(
+                query=job.query,
+                tweet_fields=tweet_fields,
+                expansions=EXPANSIONS,
+                user_fields=USER_FIELDS,
+                start_time=job.start_time,
+                end_time=job.end_time,
+                max_results=max_results,
+                **extra
+            )
+        except Exception as e:
+            if is_rate_limited(e):
+                _, reset = rate_limit_info(getattr(e.response, "headers", None))
+                bucket.pause_until(reset if reset is not None else time.time() + WINDOW_SECONDS)
+            raise
+        headers = client.rate_limit_headers() if hasattr(client, "rate_limit_headers") else None
+        bucket.sync(*rate_limit_info(headers))
+        return response
+
+    pending = [(job, dict(request_kwargs(job)) if request_kwargs else {}) for job in reversed(jobs)]
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        while pending or in_flight:
+            while pending and len(in_flight) < max_in_flight:
+                job, extra = pending.pop()
+                in_flight[pool.submit(fetch, job, extra)] = (job, extra)
+                term_in_flight[job.term] = term_in_flight.get(job.term, 0) + 1
+                stats["requests"] += 1
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                job, extra = in_flight.pop(future)
+                term_in_flight[job.term] -= 1
+                try:
+                    response = future.result()
+                except Exception as e:
+                    if is_rate_limited(e):
+                        # the bucket is paused until the window resets; try the same page again
+                        stats["rate_limited"] += 1
+                        pending.append((job, extra))
+                    else:
+                        stats["errors"] += 1
+                        print(f"  Error on '{job.term}' day {job.day_back}: {e}")
+                    continue
+
+                kept = on_page(job, response, extra)
+                term_totals[job.term] = term_totals.get(job.term, 0) + kept
+
+                next_token = (response.meta or {}).get("next_token")
+                # count pages already in flight for the term as full so the cap is not overshot
+                expected = term_totals[job.term] + term_in_flight[job.term] * max_results
+                under_cap = max_tweets_per_term is None or expected < max_tweets_per_term
+                if paginate and next_token and under_cap:
+                    page_extra = dict(extra)
+                    page_extra["next_token"] = next_token
+                    pending.append((job, page_extra))
+                elif on_done is not None:
+                    on_done(job)
+
+    return stats
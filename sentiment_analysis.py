@@ -1,68 +1,745 @@
+import os
 import sqlite3
-import torch
+import pathlib
+import time
+import queue
+import hashlib
 import numpy as np
-from collections import defaultdict
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from scipy.special import softmax
+import multiprocessing as mp
 
 # =========================
 # CONFIG
 # =========================
 DB_PATH = "twitter_data.db"
-MODEL_NAME = "cardiffnlp/twitter-roberta-base-sentiment"
+MODEL_NAME = os.environ.get("SENTIMENT_MODEL", "cardiffnlp/twitter-roberta-base-sentiment")  # hub name or local dir
+MAX_LENGTH = 512
+BATCH_TOKEN_BUDGET = 8192   # max padded tokens (rows * longest row) per forward pass
+REPLY_CHUNK_SIZE = 2048     # replies read from the DB per chunk
+SENTIMENT_COLUMNS = ("sentiment_neg", "sentiment_neu", "sentiment_pos")
+BACKEND = os.environ.get("SENTIMENT_BACKEND", "eager")  # eager (fp32) | int8 | torchscript | onnx
+BACKEND_DIR = "sentiment_backends"  # exported/quantized backends are built here once
+N_WORKERS = 1               # >1 scores replies in a pool of worker processes
+CACHE_MAX_ROWS = 5_000_000  # sentiment_cache size limit; least recently used rows are evicted
+CACHE_LOOKUP_SIZE = 500     # hashes per IN (...) lookup, well under SQLite's variable limit
 
 # =========================
 # MODEL LOAD
 # =========================
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
-model.eval()
+# torch/transformers and the model are loaded on first use, not on import,
+# so cache maintenance and the CLI start fast and spawned workers pay only once.
+_tokenizer = None
+_model = None
+_backend_fn = None
+
+
+def load_model():
+    """Returns (tokenizer, model), loading them the first time."""
+    global _tokenizer, _model
+    if _model is None:
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+        _tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+        _model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
+        _model.eval()
+    return _tokenizer, _model
+
+
+def warm_model():
+    """Loads the model and the configured backend now instead of on the first batch. Returns seconds taken."""
+    start = time.perf_counter()
+    load_model()
+    predict_logits(None)
+    return time.perf_counter() - start
+
+
+def softmax(x, axis=None):
+    e = np.exp(x - np.max(x, axis=axis, keepdims=True))
+    return e / e.sum(axis=axis, keepdims=True)
+
+
+def _logits_only(hf_model):
+    """
+    Wraps the HF model so it takes positional tensors and returns bare logits,
+    which is what torch.jit.trace and the ONNX exporter need.
+    """
+    import torch
+
+    class LogitsOnly(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = hf_model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+    return LogitsOnly()
+
+
+def backend_path(backend, model_name=MODEL_NAME):
+    filename = {"int8": "int8.pt", "torchscript": "fp32.pt", "onnx": "fp32.onnx"}[backend]
+    return os.path.join(BACKEND_DIR, model_name.replace("/", "__"), filename)
+
+
+def build_backend(backend, model_name=MODEL_NAME):
+    """
+    Builds the on-disk artifact for a non-eager backend from the locally cached
+    fp32 model, unless it already exists. Returns its path.
+    """
+    path = backend_path(backend, model_name)
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    import torch
+    tokenizer, model = load_model()
+    wrapped = _logits_only(model).eval()
+    example = tokenizer(["an example reply", "ok"], padding=True, return_tensors="pt")
+    example_args = (example["input_ids"], example["attention_mask"])
+
+    with torch.no_grad():
+        if backend == "int8":
+            quantized = torch.ao.quantization.quantize_dynamic(wrapped, {torch.nn.Linear}, dtype=torch.qint8)
+            torch.jit.save(torch.jit.trace(quantized, example_args, strict=False), path)
+        elif backend == "torchscript":
+            torch.jit.save(torch.jit.trace(wrapped, example_args, strict=False), path)
+        elif backend == "onnx":
+            torch.onnx.export(
+                wrapped,
+                example_args,
+                path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["logits"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "seq"},
+                    "attention_mask": {0: "batch", 1: "seq"},
+                    "logits": {0: "batch"},
+                },
+                opset_version=17,
+                dynamo=False
+            )
+    print(f"Built {backend} sentiment backend at {path}")
+    return path
+
+
+def import_onnxruntime():
+    """
+    Imports onnx (torch.onnx.export writes through it) and onnxruntime before
+    anything is exported. Returns onnxruntime.
+    """
+    try:
+        import onnx
+        import onnxruntime
+    except Exception as e:
+        # ImportError, or e.g. a protobuf VersionError raised while importing onnx
+        raise RuntimeError(f"The onnx sentiment backend needs working onnx and onnxruntime installs ({e})")
+    return onnxruntime
+
+
+def load_backend(backend=BACKEND):
+    """
+    Returns a function mapping tokenizer output (pt tensors) to a numpy array of logits.
+    """
+    import torch
+    if backend == "eager":
+        _, model = load_model()
+
+        def logits_fn(encoded):
+            with torch.no_grad():
+                return model(**encoded).logits.numpy()
+        return logits_fn
+
+    if backend not in ("int8", "torchscript", "onnx"):
+        raise ValueError(f"Unknown sentiment backend '{backend}'")
+    if backend == "onnx":
+        onnxruntime = import_onnxruntime()
+    path = build_backend(backend)
+
+    if backend == "onnx":
+        session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+
+        def logits_fn(encoded):
+            return session.run(
+                ["logits"],
+                {
+                    "input_ids": encoded["input_ids"].numpy(),
+                    "attention_mask": encoded["attention_mask"].numpy(),
+                }
+            )[0]
+        return logits_fn
+
+    if backend == "int8":
+        # quantized kernels need an engine registered before the graph runs
+        engines = torch.backends.quantized.supported_engines
+        if "qnnpack" in engines and "fbgemm" not in engines:
+            torch.backends.quantized.engine = "qnnpack"
+    traced = torch.jit.load(path)
+    traced.eval()
+
+    def logits_fn(encoded):
+        with torch.no_grad():
+            return traced(encoded["input_ids"], encoded["attention_mask"]).numpy()
+    return logits_fn
+
+
+def predict_logits(encoded):
+    """Logits from the configured BACKEND, loaded on the first call (encoded=None only loads it)."""
+    global _backend_fn
+    if _backend_fn is None:
+        _backend_fn = load_backend(BACKEND)
+    if encoded is not None:
+        return _backend_fn(encoded)
 
 # =========================
 # SENTIMENT FUNCTION
 # =========================
 def roberta_sentiment(text):
+    tokenizer, _ = load_model()
     encoded = tokenizer(
         text,
         return_tensors="pt",
         truncation=True,
-        max_length=512
+        max_length=MAX_LENGTH
     )
 
-    with torch.no_grad():
-        output = model(**encoded)
-
-    scores = softmax(output.logits.numpy()[0])
+    scores = softmax(predict_logits(encoded)[0])
 
     return np.array(scores)  # [neg, neu, pos]
 
 
+def length_buckets(lengths, token_budget=BATCH_TOKEN_BUDGET):
+    """
+    Groups row indices into buckets of similar token length.
+    Rows are sorted by length and a bucket is closed once
+    (rows in bucket * longest row) would exceed token_budget.
+    A single row longer than the budget still gets its own bucket.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    buckets = []
+    bucket = []
+    for i in order:
+        # sorted ascending, so the row being added is the longest in the bucket
+        if bucket and (len(bucket) + 1) * lengths[i] > token_budget:
+            buckets.append(bucket)
+            bucket = []
+        bucket.append(i)
+    if bucket:
+        buckets.append(bucket)
+    return buckets
+
+
+def roberta_sentiment_batch(texts, token_budget=BATCH_TOKEN_BUDGET, logits_fn=None):
+    """
+    Batched version of roberta_sentiment.
+    Texts are sorted by token length and packed into buckets that are
+    padded only to the longest text in the bucket, one forward pass per bucket.
+    Returns an (n, 3) array of [neg, neu, pos] in the original order.
+    logits_fn overrides the configured backend (see load_backend).
+    """
+    if logits_fn is None:
+        logits_fn = predict_logits
+    texts = [str(t) if t is not None else "" for t in texts]
+    scores = np.zeros((len(texts), 3), dtype=np.float32)
+    if not texts:
+        return scores
+
+    tokenizer, _ = load_model()
+    encoded_all = tokenizer(texts, truncation=True, max_length=MAX_LENGTH)
+    input_ids = encoded_all["input_ids"]
+    attention_mask = encoded_all["attention_mask"]
+    lengths = [len(ids) for ids in input_ids]
+
+    for bucket in length_buckets(lengths, token_budget):
+        encoded = tokenizer.pad(
+            {
+                "input_ids": [input_ids[i] for i in bucket],
+                "attention_mask": [attention_mask[i] for i in bucket],
+            },
+            return_tensors="pt"
+        )
+
+        scores[bucket] = softmax(logits_fn(encoded), axis=1)
+
+    return scores
+
+
+def check_batch_matches_per_row(texts, atol=1e-4, token_budget=BATCH_TOKEN_BUDGET):
+    """
+    Compares roberta_sentiment_batch against the one-row-at-a-time path.
+    Returns the largest absolute score difference; raises if it exceeds atol.
+    """
+    batched = roberta_sentiment_batch(texts, token_budget)
+    per_row = np.array([roberta_sentiment(str(t) if t is not None else "") for t in texts]).reshape(-1, 3)
+    max_diff = float(np.abs(batched - per_row).max()) if len(texts) else 0.0
+    if max_diff > atol:
+        raise ValueError(f"Batched scores differ from per-row scores by {max_diff:.2e} (atol={atol})")
+    return max_diff
+
+
+def compare_backends(texts, backend, reference="eager"):
+    """
+    Scores texts with backend and reference and reports how far they drift apart.
+    """
+    ref_fn = predict_logits if reference == BACKEND else load_backend(reference)
+    cand_fn = predict_logits if backend == BACKEND else load_backend(backend)
+
+    start = time.perf_counter()
+    ref_scores = roberta_sentiment_batch(texts, logits_fn=ref_fn)
+    ref_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cand_scores = roberta_sentiment_batch(texts, logits_fn=cand_fn)
+    cand_seconds = time.perf_counter() - start
+
+    drift = np.abs(cand_scores - ref_scores)
+    return {
+        "backend": backend,
+        "reference": reference,
+        "n": len(texts),
+        "agreement": float((cand_scores.argmax(axis=1) == ref_scores.argmax(axis=1)).mean()) if len(texts) else 1.0,
+        "max_drift": float(drift.max()) if len(texts) else 0.0,
+        "mean_drift": float(drift.mean()) if len(texts) else 0.0,
+        "reference_seconds": ref_seconds,
+        "backend_seconds": cand_seconds,
+    }
+
+
+def check_backend_accuracy(db_path=DB_PATH, backends=("int8", "torchscript", "onnx"), sample_size=1000):
+    """
+    Compares each backend against eager fp32 on a random sample of replies and prints
+    label agreement, score drift and speed.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        texts = [
+            normalize_text(text) for (text,) in conn.execute(
+                "SELECT text FROM replies ORDER BY RANDOM() LIMIT ?", (sample_size,)
+            )
+        ]
+    finally:
+        conn.close()
+
+    results = []
+    for backend in backends:
+        try:
+            result = compare_backends(texts, backend)
+        except (ImportError, RuntimeError) as e:
+            print(f"{backend}: skipped ({e})")
+            continue
+        results.append(result)
+        print(
+            f"{backend}: agreement={result['agreement']:.4f} "
+            f"max_drift={result['max_drift']:.4f} mean_drift={result['mean_drift']:.5f} "
+            f"time={result['backend_seconds']:.2f}s vs fp32 {result['reference_seconds']:.2f}s "
+            f"on {result['n']} replies"
+        )
+    return results
+
+
 # =========================
-# MAIN
+# SENTIMENT CACHE
 # =========================
-def main():
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+def normalize_text(text):
+    """
+    Collapses whitespace so trivially different copies of a reply share a cache entry.
+    """
+    if text is None:
+        return ""
+    return " ".join(str(text).split())
+
+
+def text_hash(normalized_text):
+    return hashlib.sha1(normalized_text.encode("utf-8")).hexdigest()
+
 
+def ensure_cache_table(conn):
+    """
+    Scores are cached per (text, model, backend): quantized and exported backends
+    drift from eager fp32, so their scores are never served for each other.
+    """
+    cols = [row[1] for row in conn.execute("PRAGMA table_info(sentiment_cache)")]
+    if cols and "backend" not in cols:
+        # rows from before the backend column could come from any backend
+        conn.execute("DROP TABLE sentiment_cache")
+        print("Dropped sentiment_cache without a backend column; replies will be rescored once")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sentiment_cache (
+            text_hash TEXT NOT NULL,
+            model_name TEXT NOT NULL,
+            backend TEXT NOT NULL,
+            neg REAL,
+            neu REAL,
+            pos REAL,
+            last_used INTEGER,
+            PRIMARY KEY (text_hash, model_name, backend)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sentiment_cache_last_used ON sentiment_cache(last_used)")
+    conn.commit()
+
+
+def lookup_cached(conn, hashes, model_name=MODEL_NAME, backend=BACKEND):
+    """
+    Returns {text_hash: np.array([neg, neu, pos])} for the hashes already cached.
+    """
+    found = {}
+    hashes = list(hashes)
+    for i in range(0, len(hashes), CACHE_LOOKUP_SIZE):
+        part = hashes[i:i + CACHE_LOOKUP_SIZE]
+        placeholders = ",".join("?" * len(part))
+        cur = conn.execute(
+            f"""SELECT text_hash, neg, neu, pos FROM sentiment_cache
+                WHERE model_name = ? AND backend = ? AND text_hash IN ({placeholders})""",
+            [model_name, backend] + part
+        )
+        for h, neg, neu, pos in cur:
+            found[h] = np.array([neg, neu, pos])
+    return found
+
+
+def score_texts_with_cache(conn, texts, model_name=MODEL_NAME, backend=BACKEND):
+    """
+    Read-only half of score_texts_cached: looks texts up in sentiment_cache and
+    sends only unseen (normalized) texts to the model, each distinct text once.
+    Returns (an (n, 3) array in input order, [(text_hash, scores)] newly scored, [text_hash] cache hits).
+    """
+    normalized = [normalize_text(t) for t in texts]
+    hashes = [text_hash(t) for t in normalized]
+
+    unique = {}
+    for h, t in zip(hashes, normalized):
+        unique.setdefault(h, t)
+
+    known = lookup_cached(conn, unique.keys(), model_name, backend)
+    hits = list(known)
+    missing = [h for h in unique if h not in known]
+
+    new_entries = []
+    if missing:
+        new_scores = roberta_sentiment_batch([unique[h] for h in missing])
+        new_entries = list(zip(missing, new_scores))
+        known.update(new_entries)
+
+    scores = np.array([known[h] for h in hashes], dtype=np.float64).reshape(-1, 3)
+    return scores, new_entries, hits
+
+
+def store_cache_entries(conn, new_entries, hits, model_name=MODEL_NAME, backend=BACKEND):
+    """
+    Writes newly scored texts into sentiment_cache and refreshes last_used for hits.
+    """
+    now = int(time.time())
+    if new_entries:
+        conn.executemany(
+            """INSERT OR REPLACE INTO sentiment_cache (text_hash, model_name, backend, neg, neu, pos, last_used)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            [
+                (h, model_name, backend, float(sc[0]), float(sc[1]), float(sc[2]), now)
+                for h, sc in new_entries
+            ]
+        )
+    if hits:
+        conn.executemany(
+            "UPDATE sentiment_cache SET last_used = ? WHERE text_hash = ? AND model_name = ? AND backend = ?",
+            [(now, h, model_name, backend) for h in hits]
+        )
+    conn.commit()
+
+
+def score_texts_cached(conn, texts, model_name=MODEL_NAME, backend=BACKEND):
+    """
+    Scores texts, sending only texts not yet in sentiment_cache to the model.
+    Returns (an (n, 3) array in input order, number of texts sent to the model).
+    """
+    scores, new_entries, hits = score_texts_with_cache(conn, texts, model_name, backend)
+    store_cache_entries(conn, new_entries, hits, model_name, backend)
+    return scores, len(new_entries)
+
+
+def evict_cache(conn, max_rows=CACHE_MAX_ROWS):
+    """
+    Deletes the least recently used cache rows beyond max_rows. Returns rows deleted.
+    """
+    n_rows = conn.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()[0]
+    excess = n_rows - max_rows
+    if excess <= 0:
+        return 0
+    conn.execute(
+        """DELETE FROM sentiment_cache WHERE rowid IN (
+               SELECT rowid FROM sentiment_cache ORDER BY last_used LIMIT ?
+           )""",
+        (excess,)
+    )
+    conn.commit()
+    return excess
+
+
+def invalidate_cache(conn, model_name=None, backend=None):
+    """
+    Drops cache entries for model_name, or for every model other than
+    MODEL_NAME when model_name is None; only backend's entries when backend
+    is given. Returns rows deleted.
+    """
+    if model_name is None:
+        where, params = "model_name != ?", [MODEL_NAME]
+    else:
+        where, params = "model_name = ?", [model_name]
+    if backend is not None:
+        where += " AND backend = ?"
+        params.append(backend)
+    cur = conn.execute(f"DELETE FROM sentiment_cache WHERE {where}", params)
+    conn.commit()
+    return cur.rowcount
+
+
+# =========================
+# STREAMING AGGREGATION
+# =========================
+def iter_reply_chunks(conn, chunk_size=REPLY_CHUNK_SIZE):
+    """
+    Yields (parent_tweet_id, text) rows from replies in chunks of chunk_size.
+    SQLite steps the cursor lazily, so only one chunk is held in memory.
+    """
+    cur = conn.cursor()
     cur.execute("""
         SELECT parent_tweet_id, text
         FROM replies
     """)
+    while True:
+        rows = cur.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield rows
 
-    rows = cur.fetchall()
-    conn.close()
 
-    tweet_sentiments = defaultdict(list)
+def accumulate_scores(sums, counts, tweet_ids, scores):
+    """
+    Adds per-reply scores into running per-parent sums and counts (in place).
+    """
+    for tweet_id, row_scores in zip(tweet_ids, scores):
+        if tweet_id in sums:
+            sums[tweet_id] += row_scores
+            counts[tweet_id] += 1
+        else:
+            sums[tweet_id] = np.array(row_scores, dtype=np.float64)
+            counts[tweet_id] = 1
 
-    for tweet_id, text in rows:
-        tweet_sentiments[tweet_id].append(roberta_sentiment(text))
 
-    mean_sentiment = {
-        tweet_id: scores.mean(axis=0)
-        for tweet_id, scores in tweet_sentiments.items()
-    }
+def ensure_sentiment_columns(conn):
+    """
+    Adds the per-class mean sentiment columns to tweets if they are missing.
+    """
+    cur = conn.cursor()
+    cur.execute("PRAGMA table_info(tweets)")
+    existing = {row[1] for row in cur.fetchall()}
+    for col in SENTIMENT_COLUMNS:
+        if col not in existing:
+            cur.execute(f"ALTER TABLE tweets ADD COLUMN {col} REAL")
+    conn.commit()
+
+
+def write_mean_sentiment(conn, sums, counts):
+    """
+    Writes mean negative/neutral/positive reply scores onto each parent tweet.
+    sentiment_score is filled with mean positive minus mean negative.
+    """
+    ensure_sentiment_columns(conn)
+
+    def rows():
+        for tweet_id, total in sums.items():
+            neg, neu, pos = total / counts[tweet_id]
+            yield float(neg), float(neu), float(pos), float(pos - neg), tweet_id
+
+    with conn:
+        conn.executemany(
+            f"""UPDATE tweets
+                SET {SENTIMENT_COLUMNS[0]} = ?, {SENTIMENT_COLUMNS[1]} = ?, {SENTIMENT_COLUMNS[2]} = ?,
+                    sentiment_score = ?
+                WHERE tweet_id = ?""",
+            rows()
+        )
+
+
+def score_replies(conn, chunk_size=REPLY_CHUNK_SIZE, on_chunk=None):
+    """
+    Single-process scoring of every reply. Returns per-parent (sums, counts).
+    on_chunk(n_rows, seconds), if given, is called after each chunk.
+    """
+    # running sum and count per parent_tweet_id; memory scales with parents, not replies
+    sums = {}
+    counts = {}
+    n_replies = 0
+    n_scored = 0
+
+    for rows in iter_reply_chunks(conn, chunk_size):
+        start = time.perf_counter()
+        reply_scores, chunk_scored = score_texts_cached(conn, [text for _, text in rows])
+        accumulate_scores(sums, counts, [tweet_id for tweet_id, _ in rows], reply_scores)
+        n_replies += len(rows)
+        n_scored += chunk_scored
+        if on_chunk:
+            on_chunk(len(rows), time.perf_counter() - start)
+        print(f"Processed {n_replies} replies for {len(sums)} parent tweets ({n_scored} sent to model)")
+
+    return sums, counts
+
+
+# =========================
+# WORKER POOL
+# =========================
+def rowid_shards(conn, n_shards):
+    """
+    Splits the replies rowid range into n_shards contiguous (lo, hi] ranges.
+    """
+    lo, hi = conn.execute("SELECT MIN(rowid), MAX(rowid) FROM replies").fetchone()
+    if lo is None:
+        return []
+    lo -= 1
+    step = max(1, -(-(hi - lo) // n_shards))
+    return [(start, min(start + step, hi)) for start in range(lo, hi, step)]
+
+
+def _pool_worker(worker_idx, db_path, lo, hi, chunk_size, n_threads, results):
+    """
+    Scores replies with lo < rowid <= hi and streams each chunk's results to the writer.
+    Runs in a spawned process; the model is loaded once per worker, before its clock starts.
+    """
+    import torch
+    torch.set_num_threads(n_threads)
+    warm_model()
+    results.put(("ready", worker_idx))
+    start = time.perf_counter()
+    n_rows = 0
+    n_scored = 0
+    try:
+        conn = sqlite3.connect(pathlib.Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+        last = lo
+        while True:
+            # keyset paging keeps each read short so the writer is never blocked for long
+            rows = conn.execute(
+                """SELECT rowid, parent_tweet_id, text FROM replies
+                   WHERE rowid > ? AND rowid <= ?
+                   ORDER BY rowid LIMIT ?""",
+                (last, hi, chunk_size)
+            ).fetchall()
+            if not rows:
+                break
+            last = rows[-1][0]
+            scores, new_entries, hits = score_texts_with_cache(conn, [text for _, _, text in rows])
+            results.put(("chunk", worker_idx, [tweet_id for _, tweet_id, _ in rows], scores, new_entries, hits))
+            n_rows += len(rows)
+            n_scored += len(new_entries)
+        conn.close()
+        results.put(("done", worker_idx, n_rows, n_scored, time.perf_counter() - start))
+    except Exception as e:
+        results.put(("error", worker_idx, repr(e)))
+
+
+def score_replies_pool(conn, db_path, n_workers, chunk_size=REPLY_CHUNK_SIZE, threads_per_worker=None):
+    """
+    Scores replies across n_workers processes, each owning a rowid range of replies.
+    This process is the single writer: it folds results into per-parent sums
+    and the sentiment cache as they arrive. Returns (sums, counts).
+    """
+    if threads_per_worker is None:
+        threads_per_worker = max(1, (os.cpu_count() or 1) // n_workers)
+
+    # WAL lets the workers keep reading while the writer commits cache entries
+    conn.execute("PRAGMA journal_mode=WAL")
+    shards = rowid_shards(conn, n_workers)
+
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue(maxsize=4 * max(1, len(shards)))
+    workers = [
+        ctx.Process(
+            target=_pool_worker,
+            args=(idx, db_path, lo, hi, chunk_size, threads_per_worker, results)
+        )
+        for idx, (lo, hi) in enumerate(shards)
+    ]
+    spawn_start = time.perf_counter()
+    for w in workers:
+        w.start()
+
+    sums = {}
+    counts = {}
+    stats = {}
+    errors = []
+    pending = len(workers)
+    # the total clock starts once every worker has loaded its model
+    n_ready = 0
+    wall_start = None
+    try:
+        while pending:
+            try:
+                msg = results.get(timeout=5)
+            except queue.Empty:
+                if not any(w.is_alive() for w in workers):
+                    errors.append(f"{pending} worker(s) exited without reporting")
+                    break
+                continue
+            if msg[0] == "chunk":
+                _, _, tweet_ids, scores, new_entries, hits = msg
+                accumulate_scores(sums, counts, tweet_ids, scores)
+                store_cache_entries(conn, new_entries, hits)
+            elif msg[0] == "ready":
+                n_ready += 1
+                if n_ready == len(workers):
+                    wall_start = time.perf_counter()
+            elif msg[0] == "done":
+                _, idx, n_rows, n_scored, elapsed = msg
+                stats[idx] = (n_rows, n_scored, elapsed)
+                pending -= 1
+            else:
+                errors.append(f"worker {msg[1]}: {msg[2]}")
+                pending -= 1
+    finally:
+        for w in workers:
+            w.join()
+    end = time.perf_counter()
+    if wall_start is None:
+        wall_start = end
+    wall = end - wall_start
+
+    print(f"\nWorker pool: {len(workers)} workers x {threads_per_worker} threads")
+    if n_ready == len(workers):
+        print(f"   model load: {wall_start - spawn_start:.1f}s")
+    total_rows = 0
+    for idx in sorted(stats):
+        n_rows, n_scored, elapsed = stats[idx]
+        total_rows += n_rows
+        rate = n_rows / elapsed if elapsed > 0 else 0.0
+        print(f"   worker {idx}: {n_rows} replies ({n_scored} sent to model) in {elapsed:.1f}s = {rate:.1f} replies/s")
+    total_rate = total_rows / wall if wall > 0 else 0.0
+    print(f"   total: {total_rows} replies in {wall:.1f}s = {total_rate:.1f} replies/s")
+
+    if errors:
+        raise RuntimeError("Sentiment workers failed: " + "; ".join(errors))
+    return sums, counts
+
+
+# =========================
+# MAIN
+# =========================
+def main(db_path=DB_PATH, chunk_size=REPLY_CHUNK_SIZE, n_workers=N_WORKERS, threads_per_worker=None, warm=False):
+    if warm and n_workers <= 1:
+        print(f"Loaded {MODEL_NAME} ({BACKEND}) in {warm_model():.1f}s")
+    conn = sqlite3.connect(db_path)
+    ensure_cache_table(conn)
+
+    try:
+        if n_workers > 1:
+            sums, counts = score_replies_pool(conn, db_path, n_workers, chunk_size, threads_per_worker)
+        else:
+            sums, counts = score_replies(conn, chunk_size)
+
+        write_mean_sentiment(conn, sums, counts)
+        evicted = evict_cache(conn)
+        if evicted:
+            print(f"Evicted {evicted} old sentiment_cache rows")
+    finally:
+        conn.close()
 
-    for tweet_id, scores in list(mean_sentiment.items())[:5]:
+    for tweet_id in list(sums)[:5]:
+        scores = sums[tweet_id] / counts[tweet_id]
         print(
             tweet_id,
             {
@@ -0,0 +1,112 @@
+"""
+Multi-term whole-word matcher for term_present, plus a DB backfill.
+
+One regex is compiled for every search term at once and reports, in a
+single pass over a text, which of the terms occur in it. The semantics match
+whole_word_present: case-insensitive, whole word / whole phrase, so
+"tax" does not match "taxation".
+
+    python term_matcher.py backfill path/to/tweets.db [chunk_size]
+"""
+import re
+import sys
+import time
+import sqlite3
+
+from tweet_ingest import apply_ingest_profile, strip_leading_handles
+
+BACKFILL_CHUNK_SIZE = 20000
+
+
+class TermMatcher:
+    def __init__(self, terms):
+        self.terms = {}
+        for term in terms:
+            if term and term.strip():
+                self.terms.setdefault(term.lower(), term)
+        # longest first so a phrase wins over a term it starts with; the
+        # shorter terms sharing that start are checked separately in terms_in()
+        keys = sorted(self.terms, key=len, reverse=True)
+        self.pattern = re.compile(
+            r"\b(?=(" + "|".join(re.escape(k) for k in keys) + r")\b)", flags=re.IGNORECASE
+        ) if keys else None
+        self.single = {k: re.compile(re.escape(k) + r"\b", flags=re.IGNORECASE) for k in keys}
+        self.prefix_terms = {
+            k: [p for p in keys if p != k and k.startswith(p)] for k in keys
+        }
+
+    @classmethod
+    def from_semantic_sets(cls, semantic_sets):
+        return cls(term for hierarchies in semantic_sets.values() for hierarchy in hierarchies for term in hierarchy)
+
+    def terms_in(self, text):
+        """Set of (original-case) terms that occur in text as whole words."""
+        if not text or self.pattern is None:
+            return set()
+        found = set()
+        for m in self.pattern.finditer(text):
+            key = m.group(1).lower()
+            found.add(key)
+            for prefix in self.prefix_terms.get(key, ()):
+                if prefix not in found and self.single[prefix].match(text, m.start()):
+                    found.add(prefix)
+        return {self.terms[k] for k in found if k in self.terms}
+
+    def contains(self, text, term):
+        return bool(term) and term.lower() in {t.lower() for t in self.terms_in(text)}
+
+
+# ===============================
+# Backfill
+# ===============================
+def backfill_term_present(conn, chunk_size=BACKFILL_CHUNK_SIZE, matcher=None):
+    """
+    Recomputes usnmtext (strip_leading_handles) and term_present for every row,
+    chunk by chunk in rowid order, one transaction per chunk. Only rows whose
+    values change are written. Returns (rows scanned, rows updated).
+    """
+    if matcher is None:
+        matcher = TermMatcher(t for (t,) in conn.execute("SELECT DISTINCT search_term FROM tweets"))
+
+    scanned = 0
+    updated = 0
+    last = 0
+    start = time.perf_counter()
+    while True:
+        rows = conn.execute(
+            """SELECT rowid, search_term, text, usnmtext, term_present FROM tweets
+               WHERE rowid > ? ORDER BY rowid LIMIT ?""",
+            (last, chunk_size)
+        ).fetchall()
+        if not rows:
+            break
+        last = rows[-1][0]
+
+        changes = []
+        for rowid, search_term, text, usnmtext, term_present in rows:
+            new_usnmtext = strip_leading_handles(text)
+            new_present = 1 if matcher.contains(new_usnmtext, search_term) else 0
+            if new_usnmtext != usnmtext or new_present != term_present:
+                changes.append((new_usnmtext, new_present, rowid))
+
+        if changes:
+            with conn:
+                conn.executemany("UPDATE tweets SET usnmtext = ?, term_present = ? WHERE rowid = ?", changes)
+        scanned += len(rows)
+        updated += len(changes)
+        elapsed = time.perf_counter() - start
+        print(f"   {scanned} rows scanned, {updated} updated ({scanned / elapsed:.0f} rows/s)")
+
+    return scanned, updated
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "backfill":
+        print(__doc__)
+        sys.exit(1)
+    conn = sqlite3.connect(sys.argv[2])
+    try:
+        apply_ingest_profile(conn)
+        backfill_term_present(conn, int(sys.argv[3]) if len(sys.argv) > 3 else BACKFILL_CHUNK_SIZE)
+    finally:
+        conn.close()
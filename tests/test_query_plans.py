@@ -0,0 +1,44 @@
+import sqlite3
+
+from tweets_schema import migrate, query_plan, PENDING_SQL, ACCEPTED_COUNT_SQL
+
+# (tweet_id, search_term, term_present, corr_def, not_bot) as the collector stored them: text
+TWEETS = [
+    ("1", "alpha", "1", "", "1"),
+    ("2", "alpha", "1", "1", "1"),
+    ("3", "Beta ", "0", "0", "0"),
+    ("4", "beta", "1", "1", " "),
+]
+
+
+def migrated_db():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        """CREATE TABLE tweets (
+               tweet_id TEXT PRIMARY KEY, usnmtext TEXT, search_term TEXT,
+               term_present TEXT, corr_def TEXT, not_bot TEXT
+           )"""
+    )
+    conn.executemany(
+        "INSERT INTO tweets (tweet_id, search_term, term_present, corr_def, not_bot) VALUES (?, ?, ?, ?, ?)",
+        TWEETS,
+    )
+    conn.commit()
+    migrate(conn)
+    return conn
+
+
+def test_pending_query_uses_pending_index():
+    conn = migrated_db()
+    plan = query_plan(conn, PENDING_SQL, ("alpha",))
+    assert any(line.startswith("SEARCH") and "USING INDEX idx_tweets_pending" in line for line in plan), plan
+    assert [row[0] for row in conn.execute(PENDING_SQL, ("alpha",))] == ["1"]
+
+
+def test_accepted_count_uses_accepted_index():
+    conn = migrated_db()
+    sql = ACCEPTED_COUNT_SQL.format(table="tweets")
+    plan = query_plan(conn, sql, ("alpha",))
+    assert any(line.startswith("SEARCH") and "USING INDEX idx_tweets_accepted" in line for line in plan), plan
+    assert conn.execute(sql, ("alpha",)).fetchone()[0] == 1
+    assert conn.execute(sql, ("beta",)).fetchone()[0] == 0
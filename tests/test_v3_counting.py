@@ -0,0 +1,71 @@
+import os
+import sqlite3
+import importlib.util
+
+import pandas as pd
+
+from tweets_schema import CREATE_TWEETS_SQL, table_columns
+from collection_state import ensure_state_table
+
+V3_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "V3 (tweets left over from filtering) bot detection AND corr_def numbering.py",
+)
+
+# (tweet_id, search_term, corr_def, not_bot)
+TWEETS = [
+    ("1", "alpha", 1.0, 1),
+    ("2", "Alpha ", 1.0, 1),
+    ("3", "alpha", 0.0, 1),
+    ("4", "alpha", 1.0, 0),
+    ("5", "beta", 1.0, 1),
+]
+
+
+def load_v3():
+    spec = importlib.util.spec_from_file_location("v3_counting", V3_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def collected_db(path):
+    """A tweets DB the collector has touched: collection_state also has search_term."""
+    conn = sqlite3.connect(path)
+    conn.execute(CREATE_TWEETS_SQL)
+    if "not_bot" not in table_columns(conn, "tweets"):
+        conn.execute("ALTER TABLE tweets ADD COLUMN not_bot INTEGER")
+    conn.executemany(
+        "INSERT INTO tweets (tweet_id, search_term, term_present, corr_def, not_bot) VALUES (?, ?, 1, ?, ?)",
+        TWEETS,
+    )
+    conn.commit()
+    ensure_state_table(conn)
+    conn.execute("INSERT INTO collection_state (search_term, slice_start) VALUES ('alpha', '2024-01-01T00:00:00')")
+    conn.commit()
+    return conn
+
+
+def test_counts_in_tweets_not_collection_state(tmp_path):
+    v3 = load_v3()
+    conn = collected_db(str(tmp_path / "tweets.db"))
+    try:
+        assert v3.get_table_with_column(conn, "search_term") == "tweets"
+    finally:
+        conn.close()
+
+
+def test_main_on_collected_db(tmp_path, monkeypatch):
+    v3 = load_v3()
+    db_path = str(tmp_path / "tweets.db")
+    collected_db(db_path).close()
+    csv_path = str(tmp_path / "phrases.csv")
+    pd.DataFrame({"phrase": ["alpha", "beta", "gamma"]}).to_csv(csv_path, index=False)
+
+    picks = iter([db_path, csv_path])
+    saved = {}
+    monkeypatch.setattr(v3, "pick_file", lambda title, filetypes: next(picks))
+    monkeypatch.setattr(pd.DataFrame, "to_excel", lambda df, path, index=True: saved.update(df=df.copy()))
+    v3.main()
+
+    assert list(saved["df"]["final_ammount"]) == [2, 1, 0]
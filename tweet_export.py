@@ -0,0 +1,316 @@
+"""
+Columnar export of a tweets DB for analysis: the tweets table partitioned by
+semantic_set and lexical_hierarchy, plus a per-term summary of the counts and
+sentiment aggregates, as Parquet or Arrow IPC.
+
+Tweets are streamed out of SQLite with fetchmany and buffered per partition.
+A partition's buffer is written as one row group once it holds ROW_GROUP_ROWS
+rows, and the largest buffer is flushed early whenever all of them together
+hold MAX_BUFFERED_ROWS. Peak memory is therefore set by those two numbers,
+not by the size of the table. The layout is hive style
+(tweets/semantic_set=<v>/lexical_hierarchy=<v>/part-0.parquet), so
+pyarrow.dataset, pandas and DuckDB read the partition columns back.
+Arrow IPC files are written uncompressed so open_export() can memory-map them.
+
+Excel is only an optional copy of the (small) summary.
+
+    python tweet_export.py path/to/tweets.db out_dir [parquet|arrow] [--excel summary.xlsx]
+"""
+import os
+import sys
+import time
+import shutil
+import sqlite3
+from urllib.parse import quote
+
+import pyarrow as pa
+
+from tweets_schema import table_columns
+from pipeline_metrics import write_atomic
+
+EXPORT_CHUNK_ROWS = 50000       # rows fetched from SQLite per fetchmany
+ROW_GROUP_ROWS = 100000         # rows per Parquet row group / IPC record batch
+MAX_BUFFERED_ROWS = 200000      # rows buffered across all partitions before the largest is flushed
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+PARTITION_SCHEMA = pa.schema([("semantic_set", pa.string()), ("lexical_hierarchy", pa.int64())])
+
+# (column, SQLite CAST type, Arrow type); columns missing from an older DB are left out
+TWEET_EXPORT_COLUMNS = (
+    ("tweet_id", "TEXT", pa.string()),
+    ("search_term", "TEXT", pa.string()),
+    ("text", "TEXT", pa.string()),
+    ("usnmtext", "TEXT", pa.string()),
+    ("term_present", "INTEGER", pa.int8()),
+    ("corr_def", "REAL", pa.float64()),
+    ("created_at", "TEXT", pa.string()),
+    ("like_count", "INTEGER", pa.int64()),
+    ("retweet_count", "INTEGER", pa.int64()),
+    ("reply_count", "INTEGER", pa.int64()),
+    ("sentiment_score", "REAL", pa.float64()),
+    ("sentiment_neg", "REAL", pa.float64()),
+    ("sentiment_neu", "REAL", pa.float64()),
+    ("sentiment_pos", "REAL", pa.float64()),
+    ("user_id", "TEXT", pa.string()),
+    ("not_bot", "INTEGER", pa.int8()),
+)
+
+SUMMARY_SQL = """
+    SELECT semantic_set, lexical_hierarchy, search_term,
+           COUNT(*) AS tweets,
+           SUM(term_present = 1) AS term_present,
+           SUM(term_present = 1 AND corr_def IS NULL) AS pending,
+           SUM({accepted}) AS accepted,
+           SUM({accepted} AND sentiment_score IS NOT NULL) AS scored,
+           AVG(CASE WHEN {accepted} THEN sentiment_score END) AS mean_sentiment,
+           MIN(CASE WHEN {accepted} THEN sentiment_score END) AS min_sentiment,
+           MAX(CASE WHEN {accepted} THEN sentiment_score END) AS max_sentiment
+    FROM tweets
+    GROUP BY semantic_set, lexical_hierarchy, search_term
+    ORDER BY semantic_set, lexical_hierarchy, search_term
+"""
+
+SUMMARY_SCHEMA = pa.schema([
+    ("semantic_set", pa.string()),
+    ("lexical_hierarchy", pa.int64()),
+    ("search_term", pa.string()),
+    ("tweets", pa.int64()),
+    ("term_present", pa.int64()),
+    ("pending", pa.int64()),
+    ("accepted", pa.int64()),
+    ("scored", pa.int64()),
+    ("mean_sentiment", pa.float64()),
+    ("min_sentiment", pa.float64()),
+    ("max_sentiment", pa.float64()),
+])
+
+
+# ============================================================
+# Writers
+# ============================================================
+def partition_dir(root, semantic_set, lexical_hierarchy):
+    """root/semantic_set=<v>/lexical_hierarchy=<v>, values URI-encoded as hive partitioning expects."""
+    parts = [
+        f"{name}={NULL_PARTITION if value is None else quote(str(value), safe='')}"
+        for name, value in zip(PARTITION_SCHEMA.names, (semantic_set, lexical_hierarchy))
+    ]
+    return os.path.join(root, *parts)
+
+
+class PartitionWriter:
+    """Keeps one open Parquet / IPC file per partition and buffers rows for it."""
+
+    def __init__(self, root, schema, file_format="parquet", row_group_rows=ROW_GROUP_ROWS,
+                 max_buffered_rows=MAX_BUFFERED_ROWS):
+        self.root = root
+        self.schema = schema
+        self.file_format = file_format
+        self.row_group_rows = row_group_rows
+        self.max_buffered_rows = max_buffered_rows
+        self.writers = {}
+        self.buffers = {}           # partition key -> [arrow tables]
+        self.buffered = {}          # partition key -> rows buffered
+        self.rows = {}              # partition key -> rows written
+
+    def _open(self, key):
+        directory = partition_dir(self.root, *key)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "part-0" + FORMATS[self.file_format])
+        if self.file_format == "parquet":
+            import pyarrow.parquet as pq
+            return pq.ParquetWriter(path, self.schema, compression="snappy")
+        return pa.ipc.new_file(pa.OSFile(path, "wb"), self.schema)
+
+    def write(self, key, table):
+        self.buffers.setdefault(key, []).append(table)
+        self.buffered[key] = self.buffered.get(key, 0) + table.num_rows
+        if self.buffered[key] >= self.row_group_rows:
+            self.flush(key)
+        while sum(self.buffered.values()) > self.max_buffered_rows:
+            self.flush(max(self.buffered, key=self.buffered.get))
+
+    def flush(self, key):
+        tables = self.buffers.pop(key, None)
+        self.buffered.pop(key, None)
+        if not tables:
+            return
+        if key not in self.writers:
+            self.writers[key] = self._open(key)
+        table = pa.concat_tables(tables)
+        if self.file_format == "parquet":
+            self.writers[key].write_table(table, row_group_size=self.row_group_rows)
+        else:
+            self.writers[key].write_table(table, max_chunksize=self.row_group_rows)
+        self.rows[key] = self.rows.get(key, 0) + table.num_rows
+
+    def close(self):
+        for key in list(self.buffers):
+            self.flush(key)
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+
+# ============================================================
+# Export
+# ============================================================
+def export_columns(conn):
+    present = table_columns(conn, "tweets")
+    return [col for col in TWEET_EXPORT_COLUMNS if col[0] in present]
+
+
+def export_tweets(conn, root, file_format="parquet", chunk_rows=EXPORT_CHUNK_ROWS, on_chunk=None):
+    """
+    Streams every tweets row into partitioned files under root.
+    on_chunk(n_rows, seconds), if given, is called after each fetched chunk.
+    Returns {(semantic_set, lexical_hierarchy): rows}.
+    """
+    columns = export_columns(conn)
+    schema = pa.schema([(name, arrow_type) for name, _, arrow_type in columns])
+    select = ", ".join(
+        ["CAST(semantic_set AS TEXT)", "CAST(lexical_hierarchy AS INTEGER)"]
+        + [f"CAST({name} AS {cast})" for name, cast, _ in columns]
+    )
+    writer = PartitionWriter(root, schema, file_format)
+    cur = conn.cursor()
+    cur.execute(f"SELECT {select} FROM tweets")
+    try:
+        while True:
+            chunk_start = time.perf_counter()
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            values = list(zip(*rows))
+            table = pa.Table.from_arrays(
+                [pa.array(values[i + 2], type=arrow_type) for i, (_, _, arrow_type) in enumerate(columns)],
+                schema=schema
+            )
+            groups = {}
+            for i, key in enumerate(zip(values[0], values[1])):
+                groups.setdefault(key, []).append(i)
+            for key, indices in groups.items():
+                writer.write(key, table if len(groups) == 1 else table.take(indices))
+            if on_chunk:
+                on_chunk(len(rows), time.perf_counter() - chunk_start)
+    finally:
+        writer.close()
+    return writer.rows
+
+
+def summary_rows(conn):
+    """Per (semantic_set, lexical_hierarchy, search_term) counts and accepted-tweet sentiment."""
+    has_not_bot = "not_bot" in table_columns(conn, "tweets")
+    # same acceptance rule as V3's final_ammount; without bot scores only corr_def applies
+    accepted = "(corr_def = 1.0 AND not_bot = 1)" if has_not_bot else "(corr_def = 1.0)"
+    return conn.execute(SUMMARY_SQL.format(accepted=accepted)).fetchall()
+
+
+def write_table(table, path, file_format):
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, path)
+    else:
+        with pa.ipc.new_file(pa.OSFile(path, "wb"), table.schema) as writer:
+            writer.write_table(table)
+
+
+def export_db(db_path, out_dir, file_format="parquet", chunk_rows=EXPORT_CHUNK_ROWS, excel_path=None, on_chunk=None):
+    """
+    Writes out_dir/tweets/ (partitioned), out_dir/summary.<ext> and
+    out_dir/manifest.json, plus the summary as Excel when excel_path is given.
+    The tweets tree is written next to the old one and swapped in at the end.
+    Returns the manifest dict.
+    """
+    import json
+
+    if file_format not in FORMATS:
+        raise ValueError(f"file_format must be one of {sorted(FORMATS)}")
+    os.makedirs(out_dir, exist_ok=True)
+    root = os.path.join(out_dir, "tweets")
+    tmp_root = root + ".partial"
+    if os.path.exists(tmp_root):
+        shutil.rmtree(tmp_root)
+
+    start = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    try:
+        columns = [name for name, _, _ in export_columns(conn)]
+        partitions = export_tweets(conn, tmp_root, file_format, chunk_rows, on_chunk)
+        summary = pa.Table.from_pylist(
+            [dict(zip(SUMMARY_SCHEMA.names, row)) for row in summary_rows(conn)], schema=SUMMARY_SCHEMA
+        )
+    finally:
+        conn.close()
+
+    if os.path.exists(root):
+        shutil.rmtree(root)
+    if os.path.exists(tmp_root):
+        os.replace(tmp_root, root)
+    else:
+        os.makedirs(root)       # empty tweets table
+    write_table(summary, os.path.join(out_dir, "summary" + FORMATS[file_format]), file_format)
+    if excel_path:
+        summary.to_pandas().to_excel(excel_path, index=False)
+
+    manifest = {
+        "format": file_format,
+        "source": os.path.abspath(db_path),
+        "exported_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "rows": sum(partitions.values()),
+        "partitions": len(partitions),
+        "columns": PARTITION_SCHEMA.names + columns,
+        "seconds": time.perf_counter() - start,
+    }
+    write_atomic(os.path.join(out_dir, "manifest.json"), json.dumps(manifest, indent=2))
+    print(f"Exported {manifest['rows']} tweets in {manifest['partitions']} partitions "
+          f"to {out_dir} ({file_format}) in {manifest['seconds']:.1f}s")
+    return manifest
+
+
+# ============================================================
+# Reading
+# ============================================================
+def read_manifest(out_dir):
+    import json
+    with open(os.path.join(out_dir, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def open_export(out_dir, memory_map=True):
+    """
+    pyarrow.dataset over an export's tweets, with semantic_set and
+    lexical_hierarchy as columns. Filter and project before to_table(), e.g.
+        open_export(d).to_table(columns=["corr_def"], filter=ds.field("semantic_set") == "political")
+    With memory_map=True Arrow IPC files are mapped instead of read.
+    """
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+
+    file_format = read_manifest(out_dir)["format"]
+    return ds.dataset(
+        os.path.join(out_dir, "tweets"),
+        format="ipc" if file_format == "arrow" else "parquet",
+        partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+        filesystem=fs.LocalFileSystem(use_mmap=memory_map),
+    )
+
+
+def read_summary(out_dir, memory_map=True):
+    file_format = read_manifest(out_dir)["format"]
+    path = os.path.join(out_dir, "summary" + FORMATS[file_format])
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        return pq.read_table(path, memory_map=memory_map)
+    source = pa.memory_map(path) if memory_map else pa.OSFile(path)
+    return pa.ipc.open_file(source).read_all()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    args = sys.argv[3:]
+    excel = args[args.index("--excel") + 1] if "--excel" in args else None
+    fmt = args[0] if args and not args[0].startswith("--") else "parquet"
+    export_db(sys.argv[1], sys.argv[2], fmt, excel_path=excel)
@@ -0,0 +1,167 @@
+"""
+Bulk ingest helpers for the TweetSearch collector: per-response row
+derivation, one executemany per response and an ingest pragma profile.
+"""
+import re
+import time
+from datetime import datetime, timezone
+
+# WAL + synchronous=NORMAL: one fsync per checkpoint instead of per commit.
+INGEST_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",   # 64 MB page cache
+    "PRAGMA temp_store=MEMORY",
+)
+
+TWEET_COLUMNS = (
+    "tweet_id", "semantic_set", "lexical_hierarchy", "search_term",
+    "text", "usnmtext", "term_present", "corr_def",
+    "created_at", "like_count", "retweet_count", "reply_count", "sentiment_score",
+    "user_id",
+)
+
+INSERT_TWEET_SQL = f"""
+    INSERT OR IGNORE INTO tweets ({", ".join(TWEET_COLUMNS)})
+    VALUES ({", ".join("?" * len(TWEET_COLUMNS))})
+"""
+
+
+# author fields are upserted into users once per response; newer metrics win
+UPSERT_USER_SQL = """
+    INSERT INTO users (
+        user_id, username, name, followers_count, following_count, tweet_count,
+        account_created_at, metrics_observed_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(user_id) DO UPDATE SET
+        username = excluded.username,
+        name = excluded.name,
+        followers_count = excluded.followers_count,
+        following_count = excluded.following_count,
+        tweet_count = excluded.tweet_count,
+        account_created_at = excluded.account_created_at,
+        metrics_observed_at = excluded.metrics_observed_at
+    WHERE users.metrics_observed_at IS NULL OR excluded.metrics_observed_at >= users.metrics_observed_at
+"""
+
+
+# ===============================
+# Text helpers
+# ===============================
+def strip_leading_handles(text):
+    """
+    Removes leading tokens that start with '@' (only at the beginning).
+    Does NOT remove @mentions later in the text.
+    """
+    if not text:
+        return text
+    tokens = text.split()
+    i = 0
+    while i < len(tokens) and tokens[i].startswith("@"):
+        i += 1
+    return " ".join(tokens[i:])
+
+def term_pattern(term):
+    """
+    Case-insensitive whole-word / whole-phrase pattern.
+    - tax should NOT match taxation
+    - multi-word phrase should match as a phrase
+    """
+    return re.compile(r"\b" + re.escape(term) + r"\b", flags=re.IGNORECASE)
+
+def whole_word_present(text, term):
+    if not text or not term:
+        return False
+    return term_pattern(term).search(text) is not None
+
+
+# ===============================
+# Bulk ingest
+# ===============================
+def apply_ingest_profile(conn):
+    for pragma in INGEST_PRAGMAS:
+        conn.execute(pragma)
+
+def tweet_rows(tweets, users, semantic_set, hierarchy_idx, search_term, matcher=None):
+    """
+    Builds insert rows for one API response. term_present comes from matcher
+    (a term_matcher.TermMatcher) when given, else from a pattern compiled once
+    for the whole response. Tweets whose author is missing from `users` are skipped.
+    """
+    pattern = term_pattern(search_term) if search_term and matcher is None else None
+    rows = []
+    for tweet in tweets:
+        user = users.get(tweet.author_id)
+        if not user:
+            continue
+        usnmtext_value = strip_leading_handles(tweet.text)
+        if matcher is not None:
+            term_present_value = 1 if matcher.contains(usnmtext_value, search_term) else 0
+        else:
+            term_present_value = 1 if pattern and usnmtext_value and pattern.search(usnmtext_value) else 0
+        rows.append((
+            tweet.id,
+            semantic_set,
+            hierarchy_idx,      # lexical hierarchy position
+            search_term,
+            tweet.text,
+            usnmtext_value,
+            term_present_value,
+            None,               # corr_def placeholder
+            tweet.created_at.isoformat(),
+            tweet.public_metrics.get("like_count", 0),
+            tweet.public_metrics.get("retweet_count", 0),
+            tweet.public_metrics.get("reply_count", 0),
+            None,               # sentiment score placeholder
+            user.id
+        ))
+    return rows
+
+def user_rows(users, observed_at=None):
+    """One users upsert row per author in a response, stamped with observed_at (default: now)."""
+    observed_at = observed_at or datetime.now(timezone.utc).isoformat()
+    return [
+        (
+            user.id,
+            user.username,
+            user.name,
+            user.public_metrics.get("followers_count", 0),
+            user.public_metrics.get("following_count", 0),
+            user.public_metrics.get("tweet_count", 0),
+            user.created_at.isoformat(),
+            observed_at
+        )
+        for user in users
+    ]
+
+def insert_rows(conn, rows, users=()):
+    """
+    Writes tweet rows and user upserts in one transaction.
+    Returns the number of tweets actually inserted (not ignored).
+    """
+    if not rows and not users:
+        return 0
+    with conn:
+        conn.executemany(UPSERT_USER_SQL, users)
+        before = conn.total_changes
+        conn.executemany(INSERT_TWEET_SQL, rows)
+        inserted = conn.total_changes - before
+    return inserted
+
+
+class IngestMeter:
+    """Tracks rows written and time spent writing them."""
+
+    def __init__(self):
+        self.rows = 0
+        self.seconds = 0.0
+
+    def write(self, conn, rows, users=()):
+        start = time.perf_counter()
+        inserted = insert_rows(conn, rows, users)
+        self.seconds += time.perf_counter() - start
+        self.rows += inserted
+        return inserted
+
+    def rate(self):
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
@@ -0,0 +1,328 @@
+"""
+Schema migrations for the tweets DB shared by the collector, the Gemini
+scorer and the V3 counting script.
+
+Run directly (or `python cli.py migrate`) to migrate a DB, including the
+users split, and print the query plans of the hot queries:
+    python tweets_schema.py path/to/tweets.db [--accepted-summary | --drop-accepted-summary]
+"""
+import sys
+import sqlite3
+
+SCHEMA_VERSION = 2
+
+# Base tables as created by the collector. Existing DBs are never rewritten by these;
+# migrate(split=True) moves older wide tweets tables (author columns on every row) to this layout.
+CREATE_TWEETS_SQL = """
+CREATE TABLE IF NOT EXISTS tweets (
+    tweet_id TEXT PRIMARY KEY,
+    semantic_set TEXT,
+    lexical_hierarchy INTEGER,
+    search_term TEXT,
+    text TEXT,
+    usnmtext TEXT,
+    term_present BOOLEAN,
+    corr_def REAL,
+    created_at TEXT,
+    like_count INTEGER,
+    retweet_count INTEGER,
+    reply_count INTEGER,
+    sentiment_score REAL,
+    user_id TEXT
+)
+"""
+
+# One row per author. metrics_observed_at is when the metric fields were
+# captured; an upsert only replaces them with a newer observation.
+CREATE_USERS_SQL = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    username TEXT,
+    name TEXT,
+    followers_count INTEGER,
+    following_count INTEGER,
+    tweet_count INTEGER,
+    account_created_at TEXT,
+    metrics_observed_at TEXT
+)
+"""
+
+USER_COLUMNS = ("username", "name", "followers_count", "following_count", "tweet_count", "account_created_at")
+
+# Replies to collected tweets; sentiment_analysis.py scores these per parent_tweet_id
+CREATE_REPLIES_SQL = """
+CREATE TABLE IF NOT EXISTS replies (
+    reply_id TEXT PRIMARY KEY,
+    parent_tweet_id TEXT,
+    conversation_id TEXT,
+    text TEXT,
+    created_at TEXT,
+    user_id TEXT
+)
+"""
+
+# Old wide row shape for readers that still expect author fields on each tweet
+CREATE_TWEETS_WIDE_SQL = """
+CREATE VIEW IF NOT EXISTS tweets_wide AS
+SELECT
+    t.tweet_id, t.semantic_set, t.lexical_hierarchy, t.search_term,
+    t.text, t.usnmtext, t.term_present, t.corr_def,
+    t.created_at, t.like_count, t.retweet_count, t.reply_count, t.sentiment_score,
+    t.user_id, u.username, u.name, u.followers_count, u.following_count, u.tweet_count, u.account_created_at
+FROM tweets t
+LEFT JOIN users u ON u.user_id = t.user_id
+"""
+
+# Hot queries, written so they can use the indexes below.
+# LOWER(TRIM(search_term)) must stay spelled exactly like this to match the expression indexes.
+PENDING_SQL = """
+    SELECT tweet_id, usnmtext FROM tweets
+    WHERE LOWER(TRIM(search_term)) = LOWER(TRIM(?))
+      AND term_present = 1
+      AND corr_def IS NULL
+"""
+
+ACCEPTED_COUNT_SQL = """
+    SELECT COUNT(*) FROM {table}
+    WHERE LOWER(TRIM(search_term)) = LOWER(TRIM(?))
+      AND corr_def = 1.0
+      AND not_bot = 1
+"""
+
+
+# ============================================================
+# Helpers
+# ============================================================
+def table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def normalize_column(conn, table, col, sql_type):
+    """
+    Stores text values of col as sql_type and turns blank strings into NULL,
+    so plain `col = 1` / `col IS NULL` comparisons behave like the old CAST/TRIM ones.
+    """
+    conn.execute(f"UPDATE {table} SET {col} = NULL WHERE typeof({col}) = 'text' AND TRIM({col}) = ''")
+    conn.execute(f"UPDATE {table} SET {col} = CAST({col} AS {sql_type}) WHERE typeof({col}) = 'text'")
+
+
+def ensure_replies_table(conn):
+    """Creates replies and the parent_tweet_id index used to fetch one tweet's replies."""
+    conn.execute(CREATE_REPLIES_SQL)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_replies_parent ON replies(parent_tweet_id)")
+    conn.commit()
+
+
+def split_users(conn, table="tweets"):
+    """
+    Moves author fields out of a wide tweets table into users (latest tweet per
+    author wins) and drops them from tweets. The file only shrinks after VACUUM.
+    """
+    conn.execute(CREATE_USERS_SQL)
+    cols = table_columns(conn, table)
+    if "username" not in cols:
+        return
+    conn.execute(f"""
+        INSERT OR REPLACE INTO users (user_id, {", ".join(USER_COLUMNS)}, metrics_observed_at)
+        SELECT user_id, {", ".join(USER_COLUMNS)}, MAX(created_at)
+        FROM {table}
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id
+    """)
+    for col in USER_COLUMNS:
+        if col in cols:
+            conn.execute(f"ALTER TABLE {table} DROP COLUMN {col}")
+
+
+# ============================================================
+# Migration
+# ============================================================
+def needs_users_split(conn, table="tweets"):
+    """True while tweets still carries the author columns split_users() moves into users."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    return table == "tweets" and version < 2 and "username" in table_columns(conn, table)
+
+
+def require_users_split(conn):
+    """For writers and readers of users: refuses a DB whose users split has not run yet."""
+    if needs_users_split(conn):
+        raise RuntimeError(
+            "tweets still has the author columns; run `python cli.py migrate --db <path>` once "
+            "to move them into users"
+        )
+
+
+def migrate(conn, table="tweets", split=False):
+    """
+    Brings the tweets table up to SCHEMA_VERSION. Safe to run on every start:
+    value normalization runs once per DB, index and view creation is idempotent.
+    The users split drops columns from tweets, so it only runs with split=True
+    (cli.py migrate / running this module); until then the DB stays at version 1.
+    """
+    cols = table_columns(conn, table)
+    if not cols:
+        return
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    keep_wide = not split and needs_users_split(conn, table)
+
+    with conn:
+        if version < 1:
+            normalize_column(conn, table, "term_present", "INTEGER")
+            normalize_column(conn, table, "corr_def", "REAL")
+            if "not_bot" in cols:
+                normalize_column(conn, table, "not_bot", "INTEGER")
+
+        if version < 2 and table == "tweets" and not keep_wide:
+            split_users(conn, table)
+            cols = table_columns(conn, table)
+        if table == "tweets" and "user_id" in cols and not keep_wide:
+            conn.execute(CREATE_USERS_SQL)
+            conn.execute(CREATE_TWEETS_WIDE_SQL)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tweets_user_id ON tweets(user_id)")
+
+        # only the rows still waiting for a corr_def score, per search term
+        conn.execute(
+            f"""CREATE INDEX IF NOT EXISTS idx_{table}_pending ON {table}(LOWER(TRIM(search_term)))
+                WHERE term_present = 1 AND corr_def IS NULL"""
+        )
+        if "not_bot" in cols:
+            # only the accepted rows (corr_def = 1, not a bot), per search term
+            conn.execute(
+                f"""CREATE INDEX IF NOT EXISTS idx_{table}_accepted ON {table}(LOWER(TRIM(search_term)))
+                    WHERE corr_def = 1.0 AND not_bot = 1"""
+            )
+
+        target = 1 if keep_wide else SCHEMA_VERSION
+        if version < target:
+            conn.execute(f"PRAGMA user_version = {target}")
+
+
+# ============================================================
+# Accepted-count summary (optional)
+# ============================================================
+# NULL search_term / semantic_set / lexical_hierarchy are stored as '' / '' / -1 so they still
+# collapse onto one summary row (NULLs never conflict in a primary key).
+_SUMMARY_KEY = "IFNULL(LOWER(TRIM({r}.search_term)), ''), IFNULL({r}.semantic_set, ''), IFNULL({r}.lexical_hierarchy, -1)"
+_ACCEPTED = "{r}.corr_def = 1.0 AND {r}.not_bot = 1"
+
+
+def summary_table(table="tweets"):
+    return f"{table}_accepted_counts"
+
+
+def has_accepted_summary(conn, table="tweets"):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (summary_table(table),)
+    ).fetchone()
+    return row is not None
+
+
+def create_accepted_summary(conn, table="tweets"):
+    """
+    Creates <table>_accepted_counts(search_key, semantic_set, lexical_hierarchy, n),
+    fills it from the current rows and adds triggers that keep it in step with
+    every insert, delete and relevant update. Costs a little on each write.
+    """
+    summary = summary_table(table)
+    upsert = (
+        f"INSERT INTO {summary} (search_key, semantic_set, lexical_hierarchy, n) "
+        f"VALUES ({_SUMMARY_KEY.format(r='NEW')}, 1) "
+        f"ON CONFLICT(search_key, semantic_set, lexical_hierarchy) DO UPDATE SET n = n + 1;"
+    )
+    decrement = (
+        f"UPDATE {summary} SET n = n - 1 "
+        f"WHERE (search_key, semantic_set, lexical_hierarchy) = ({_SUMMARY_KEY.format(r='OLD')});"
+    )
+    with conn:
+        conn.execute(f"DROP TABLE IF EXISTS {summary}")
+        conn.execute(f"""
+            CREATE TABLE {summary} (
+                search_key TEXT NOT NULL,
+                semantic_set TEXT NOT NULL,
+                lexical_hierarchy INTEGER NOT NULL,
+                n INTEGER NOT NULL,
+                PRIMARY KEY (search_key, semantic_set, lexical_hierarchy)
+            )
+        """)
+        conn.execute(f"""
+            INSERT INTO {summary} (search_key, semantic_set, lexical_hierarchy, n)
+            SELECT {_SUMMARY_KEY.format(r=table)}, COUNT(*)
+            FROM {table}
+            WHERE {_ACCEPTED.format(r=table)}
+            GROUP BY 1, 2, 3
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {summary}_ins AFTER INSERT ON {table}
+            WHEN {_ACCEPTED.format(r='NEW')}
+            BEGIN {upsert} END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {summary}_del AFTER DELETE ON {table}
+            WHEN {_ACCEPTED.format(r='OLD')}
+            BEGIN {decrement} END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {summary}_upd_old
+            AFTER UPDATE OF search_term, semantic_set, lexical_hierarchy, corr_def, not_bot ON {table}
+            WHEN {_ACCEPTED.format(r='OLD')}
+            BEGIN {decrement} END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {summary}_upd_new
+            AFTER UPDATE OF search_term, semantic_set, lexical_hierarchy, corr_def, not_bot ON {table}
+            WHEN {_ACCEPTED.format(r='NEW')}
+            BEGIN {upsert} END
+        """)
+
+
+def drop_accepted_summary(conn, table="tweets"):
+    summary = summary_table(table)
+    with conn:
+        for suffix in ("ins", "del", "upd_old", "upd_new"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {summary}_{suffix}")
+        conn.execute(f"DROP TABLE IF EXISTS {summary}")
+
+
+# ============================================================
+# Query plan checks
+# ============================================================
+def query_plan(conn, sql, params=()):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def check_query_plans(conn, table="tweets"):
+    """
+    Returns {query name: plan lines}; raises RuntimeError if a hot query
+    would scan the table instead of searching an index.
+    """
+    plans = {"pending": query_plan(conn, PENDING_SQL, ("x",))}
+    if "not_bot" in table_columns(conn, table):
+        plans["accepted_count"] = query_plan(conn, ACCEPTED_COUNT_SQL.format(table=table), ("x",))
+
+    for name, plan in plans.items():
+        if not any("USING" in line and "INDEX" in line for line in plan) or any(line.startswith("SCAN") for line in plan):
+            raise RuntimeError(f"Query '{name}' does not use an index: {plan}")
+    return plans
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    flags = {a for a in sys.argv[1:] if a.startswith("--")}
+    if len(args) != 1:
+        print("Usage: python tweets_schema.py path/to/tweets.db [--accepted-summary | --drop-accepted-summary]")
+        sys.exit(1)
+    conn = sqlite3.connect(args[0])
+    try:
+        migrate(conn, split=True)
+        if "--accepted-summary" in flags:
+            create_accepted_summary(conn)
+            print(f"Created {summary_table()} with triggers.")
+        if "--drop-accepted-summary" in flags:
+            drop_accepted_summary(conn)
+            print(f"Dropped {summary_table()}.")
+        for name, plan in check_query_plans(conn).items():
+            print(f"{name}:")
+            for line in plan:
+                print(f"   {line}")
+    finally:
+        conn.close()